@@ -0,0 +1,86 @@
+"""
+Compares CSV and binary COPY on the provider schema.
+
+Usage: poetry run python benchmarks/copy_format.py --rows 1000000
+"""
+
+import argparse
+import time
+
+import loguru
+from sqlalchemy import text
+
+from promptly.adapters.data.postgres.datagen import (
+    PROVIDER_COLUMNS,
+    generate_provider_frame,
+)
+from promptly.adapters.postgres import iter_binary_copy, iter_csv_copy
+from promptly.settings import configure_settings
+
+logger = loguru.logger
+
+BENCHMARK_TABLE = 'provider_copy_benchmark'
+
+
+def benchmark_copy_formats(rows: int, chunk_size: int, seed: int):
+    db = configure_settings().health_care_db
+
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {BENCHMARK_TABLE}'))
+        connection.execute(
+            text(
+                f'CREATE UNLOGGED TABLE {BENCHMARK_TABLE} '
+                + '(LIKE provider INCLUDING DEFAULTS)'
+            )
+        )
+
+    df = generate_provider_frame(rows, seed=seed)[PROVIDER_COLUMNS]
+    frames = [
+        df.iloc[start : start + chunk_size]
+        for start in range(0, rows, chunk_size)
+    ]
+    schema = db.arrow_schema(BENCHMARK_TABLE, PROVIDER_COLUMNS)
+
+    encoders = {
+        'csv': iter_csv_copy,
+        'binary': lambda chunks: iter_binary_copy(chunks, schema),
+    }
+
+    for copy_format, encode in encoders.items():
+        encode_time_start = time.time()
+        payload_bytes = sum(len(chunk) for chunk in encode(frames))
+        encode_seconds = time.time() - encode_time_start
+
+        with db.engine.begin() as connection:
+            connection.execute(text(f'TRUNCATE {BENCHMARK_TABLE}'))
+
+        load_time_start = time.time()
+        db.bulk_load(
+            BENCHMARK_TABLE,
+            df,
+            workers=1,
+            columns=PROVIDER_COLUMNS,
+            chunk_size=chunk_size,
+            copy_format=copy_format,
+        )
+        load_seconds = time.time() - load_time_start
+
+        logger.info(
+            f'{copy_format}: encode {encode_seconds:.2f}s, '
+            + f'encode+COPY {load_seconds:.2f}s '
+            + f'({rows / load_seconds:,.0f} rows/s), '
+            + f'{payload_bytes / 2**20:.1f} MiB on the wire.'
+        )
+
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE {BENCHMARK_TABLE}'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    benchmark_copy_formats(args.rows, args.chunk_size, args.seed)
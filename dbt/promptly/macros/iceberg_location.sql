@@ -0,0 +1,5 @@
+{% macro iceberg_location(path) -%}
+    {#- Tenants write under their own prefix, so concurrent tenants never
+        share (or drop) each other's table files -#}
+    s3://iceberg/{{ env_var('PROMPTLY_BUCKET_PREFIX', '') }}{{ path }}
+{%- endmacro %}
@@ -2,7 +2,7 @@
   config(
     materialized = "table",
     format = "PARQUET",
-    location = "s3://iceberg/curated/provider/",
+    location = iceberg_location("curated/provider/"),
     schema = "curated",
     tags = ["curated"]
   ) 
@@ -2,14 +2,18 @@
   config(
     materialized = "table",
     format = "PARQUET",
-    location = "s3://iceberg/raw/care_site_postgres/",
+    location = iceberg_location("raw/care_site_postgres/"),
     schema = "raw",
     tags = ["postgres", "raw"]
   ) 
 }}
 
+-- Postgres has no load timestamp to check freshness with; its CDC topic
+-- does, so new care_site events select this model via source_status.
+-- depends_on: {{ source('kafka', 'care_site') }}
+
 select
     care_site_id,
     care_site_name,
     care_site_source_value
-from postgresql.public.care_site
+from {{ source('postgresql', 'care_site') }}
@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
+
+from promptly.adapters.engine import TrinoCluster
+from promptly.adapters.postgres import HealthCareDB
+from promptly.adapters.s3 import MinioS3
+
+_EXHAUSTED = object()
+
+
+class AsyncAdapter:
+    """
+    Async facade over a blocking adapter.
+
+    Every method of the wrapped adapter is exposed as a coroutine that
+    runs on a dedicated thread pool, with at most `max_concurrency` calls
+    in flight; the rest wait on a semaphore instead of piling up threads.
+    Generator methods (`iter_query`, `open_stream`, `list_objects`, ...)
+    are consumed with `iterate`, which fetches one item per thread hop.
+
+    An open query iterator holds a pooled connection between hops, so
+    `max_open_iterators` (the adapter's connection capacity) caps how
+    many are open at once. Consumers beyond it wait for a free slot
+    instead of taking every worker thread waiting on the pool, which
+    would keep the open iterators from ever advancing.
+    """
+
+    def __init__(
+        self,
+        adapter,
+        max_concurrency: int = 16,
+        max_open_iterators: int | None = None,
+    ):
+        self.adapter = adapter
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._iterator_slots = (
+            asyncio.Semaphore(max_open_iterators)
+            if max_open_iterators is not None
+            else contextlib.nullcontext()
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix=type(adapter).__name__,
+        )
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.adapter, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await self.run(attribute, *args, **kwargs)
+
+        return call
+
+    async def run(self, func, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def iterate(self, method: str, *args, **kwargs) -> AsyncIterator:
+        async with self._iterator_slots:
+            iterator = iter(getattr(self.adapter, method)(*args, **kwargs))
+            try:
+                while True:
+                    item = await self.run(next, iterator, _EXHAUSTED)
+                    if item is _EXHAUSTED:
+                        return
+                    yield item
+            finally:
+                # Runs the generator's cleanup (cursors, responses) on a
+                # worker
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    await self.run(close)
+
+    async def aclose(self):
+        close = getattr(self.adapter, 'close', None)
+        if close is not None:
+            await self.run(close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+class AsyncHealthCareDB(AsyncAdapter):
+    def __init__(self, db: HealthCareDB, max_concurrency: int | None = None):
+        # More concurrent calls than pooled connections would only queue
+        # inside the pool, holding threads while they wait
+        super().__init__(
+            db,
+            max_concurrency or db.max_connections,
+            max_open_iterators=db.max_connections,
+        )
+
+
+class AsyncMinioS3(AsyncAdapter):
+    def __init__(self, s3: MinioS3, max_concurrency: int = 32):
+        # The HTTP pool opens extra connections instead of blocking, so
+        # open streams never starve each other
+        super().__init__(s3, max_concurrency)
+
+
+class AsyncTrinoCluster(AsyncAdapter):
+    def __init__(self, trino: TrinoCluster, max_concurrency: int = 8):
+        super().__init__(
+            trino, max_concurrency, max_open_iterators=trino.max_connections
+        )
+
+
+async def gather_bounded(coroutines, limit: int, return_exceptions=False):
+    """`asyncio.gather` that runs at most `limit` coroutines at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(
+        *(bounded(coroutine) for coroutine in coroutines),
+        return_exceptions=return_exceptions,
+    )
@@ -1,22 +1,205 @@
-import random
-import string
+import math
 import time
 from io import StringIO
+from typing import Iterator
 
 import loguru
+import numpy as np
 import pandas as pd
 import psycopg2
 
 from promptly.adapters.postgres import HealthCareDB
+from promptly.adapters.streams import IteratorIO
 
 logger = loguru.logger
 
 DEFAULT_POSTGRES_PORT = 5432
 
+# Upper bound (exclusive) of the 10-digit NPI key space
+NPI_SPACE = 10**10
 
-def ingest_fake_data(
+DEFAULT_CHUNK_SIZE = 250_000
+COPY_BUFFER_SIZE = 1 << 20
+
+CARE_SITES = [
+    ('City Hospital', 'CSH01'),
+    ('Village Clinic', 'VCL01'),
+    ('Metro Medical Center', 'MMC01'),
+    ('Suburban Health', 'SH01'),
+    ('North Health Institute', 'NHI01'),
+    ('Eastside Clinic', 'EC01'),
+    ('Downtown Health', 'DH01'),
+    ('Westside Family Practice', 'WFP01'),
+]
+
+FIRST_NAMES = [
+    'John',
+    'Jane',
+    'Emily',
+    'Michael',
+    'Sarah',
+    'Robert',
+    'Linda',
+    'Kevin',
+    'Patricia',
+    'Laura',
+]
+
+LAST_NAMES = [
+    'Doe',
+    'Smith',
+    'Johnson',
+    'Brown',
+    'Wilson',
+    'Garcia',
+    'Martinez',
+    'Lee',
+    'Rodriguez',
+    'Davis',
+]
+
+SPECIALTIES = [
+    'Cardiology',
+    'Pediatrics',
+    'Neurology',
+    'Oncology',
+    'Dermatology',
+    'Orthopedics',
+    'Internal Medicine',
+    'General Practice',
+]
+
+PROVIDER_COLUMNS = [
+    'provider_name',
+    'npi',
+    'specialty',
+    'care_site',
+    'provider_source_value',
+    'specialty_source_value',
+    'provider_id_source_value',
+]
+
+
+def _npi_digits(npis: np.ndarray) -> np.ndarray:
+    """Zero padded ASCII digits of each NPI as an (n, 10) uint8 matrix."""
+    powers = 10 ** np.arange(9, -1, -1, dtype=np.int64)
+    return ((npis[:, None] // powers) % 10 + ord('0')).astype(np.uint8)
+
+
+def generate_provider_frame(
+    num_rows: int,
+    seed: int | np.random.Generator | None = None,
+    npi_range: tuple[int, int] = (0, NPI_SPACE),
+) -> pd.DataFrame:
+    """
+    Draws `num_rows` fake providers column by column.
+
+    NPIs are sampled without replacement from `npi_range`, so they are
+    unique by construction and no dedupe pass is needed.
+    """
+    rng = np.random.default_rng(seed)
+
+    npi_low, npi_high = npi_range
+    npis = npi_low + rng.choice(
+        npi_high - npi_low, size=num_rows, replace=False
+    )
+    first_idx = rng.integers(len(FIRST_NAMES), size=num_rows)
+    last_idx = rng.integers(len(LAST_NAMES), size=num_rows)
+    specialty_idx = rng.integers(len(SPECIALTIES), size=num_rows)
+    care_site_idx = rng.integers(len(CARE_SITES), size=num_rows)
+
+    # Names only have len(FIRST_NAMES) * len(LAST_NAMES) combinations, so
+    # they are gathered from precomputed lookup tables instead of formatted
+    # once per row.
+    name_codes = first_idx * len(LAST_NAMES) + last_idx
+    provider_names = np.array(
+        [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES],
+        dtype=object,
+    )
+    provider_source_values = np.array(
+        [f'{first[0]}{last}' for first in FIRST_NAMES for last in LAST_NAMES],
+        dtype=object,
+    )
+
+    npi_digits = _npi_digits(npis)
+    # First initial + '-' + NPI, assembled as fixed width ASCII bytes
+    id_source = np.empty((num_rows, 12), dtype=np.uint8)
+    initials = np.frombuffer(
+        ''.join(first[0] for first in FIRST_NAMES).encode('ascii'),
+        dtype=np.uint8,
+    )
+    id_source[:, 0] = initials[first_idx]
+    id_source[:, 1] = ord('-')
+    id_source[:, 2:] = npi_digits
+
+    specialty = pd.Categorical.from_codes(specialty_idx, SPECIALTIES)
+
+    return pd.DataFrame({
+        'provider_name': provider_names[name_codes],
+        'npi': npi_digits.view('S10').ravel().astype(str),
+        'specialty': specialty,
+        'care_site': pd.Categorical.from_codes(
+            care_site_idx, [name for name, _ in CARE_SITES]
+        ),
+        'provider_source_value': provider_source_values[name_codes],
+        'specialty_source_value': specialty,
+        'provider_id_source_value': (
+            id_source.view('S12').ravel().astype(str)
+        ),
+    })
+
+
+def iter_provider_chunks(
+    num_rows: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields `num_rows` fake providers as frames of at most `chunk_size` rows.
+
+    Each chunk draws its NPIs from its own slice of the key space, which
+    keeps them unique across the whole stream without remembering the
+    values already emitted.
+    """
+    rng = np.random.default_rng(seed)
+    num_chunks = math.ceil(num_rows / chunk_size)
+    band_width = NPI_SPACE // max(num_chunks, 1)
+
+    for chunk_number in range(num_chunks):
+        rows = min(chunk_size, num_rows - chunk_number * chunk_size)
+        band_start = chunk_number * band_width
+        yield generate_provider_frame(
+            rows,
+            seed=rng,
+            npi_range=(band_start, band_start + band_width),
+        )
+
+
+def _csv_chunks(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    total_rows = 0
+    chunk_time_start = time.time()
+
+    for chunk_number, df in enumerate(frames, start=1):
+        yield df.to_csv(index=False, header=False).encode('utf-8')
+
+        # Measured once COPY asks for the next chunk, so it covers
+        # generating, encoding and sending this one to Postgres.
+        elapsed = time.time() - chunk_time_start
+        total_rows += len(df)
+        logger.info(
+            f'Chunk {chunk_number}: copied {len(df)} rows in {elapsed:.2f}s '
+            + f'({len(df) / elapsed:,.0f} rows/s, {total_rows} total).'
+        )
+        chunk_time_start = time.time()
+
+
+def ingest_fake_data(  # noqa: PLR0913, PLR0917
     MAX_NUM_ROWS: int = 2000000,
     db: HealthCareDB = None,
+    seed: int | None = None,
+    stream: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
 ):
     # Create a connection to PostgreSQL
     conn = psycopg2.connect(
@@ -42,20 +225,8 @@ def ingest_fake_data(
     );
     """)  # noqa:E501
 
-    # Sample care site data
-    care_sites = [
-        ('City Hospital', 'CSH01'),
-        ('Village Clinic', 'VCL01'),
-        ('Metro Medical Center', 'MMC01'),
-        ('Suburban Health', 'SH01'),
-        ('North Health Institute', 'NHI01'),
-        ('Eastside Clinic', 'EC01'),
-        ('Downtown Health', 'DH01'),
-        ('Westside Family Practice', 'WFP01'),
-    ]
-
     # Insert care site data into the table
-    for care_site in care_sites:
+    for care_site in CARE_SITES:
         cursor.execute(
             """
             INSERT INTO care_site (care_site_name, care_site_source_value)
@@ -80,126 +251,65 @@ def ingest_fake_data(
     );
     """)  # noqa:E501
 
-    # Function to generate a random NPI
-    def generate_npi():
-        return ''.join(random.choices(string.digits, k=10))
-
-    # Function to generate random provider names
-    def generate_provider_name():
-        first_names = [
-            'John',
-            'Jane',
-            'Emily',
-            'Michael',
-            'Sarah',
-            'Robert',
-            'Linda',
-            'Kevin',
-            'Patricia',
-            'Laura',
-        ]
-
-        last_names = [
-            'Doe',
-            'Smith',
-            'Johnson',
-            'Brown',
-            'Wilson',
-            'Garcia',
-            'Martinez',
-            'Lee',
-            'Rodriguez',
-            'Davis',
-        ]
-
-        return f'{random.choice(first_names)} {random.choice(last_names)}'
-
-    # Insert 2 million provider rows into the table
-    def generate_row():
-        provider_name = generate_provider_name()
-        npi = generate_npi()
-        specialty = random.choice([
-            'Cardiology',
-            'Pediatrics',
-            'Neurology',
-            'Oncology',
-            'Dermatology',
-            'Orthopedics',
-            'Internal Medicine',
-            'General Practice',
-        ])
-        care_site = random.choice(
-            care_sites
-        )[
-            0
-        ]  # Randomly choose a care site name from the care_sites list # noqa:E501
-        provider_source_value = (
-            provider_name.split()[0][0] + provider_name.split()[1]
-        )  # First initial + last name
-        specialty_source_value = specialty
-        provider_id_source_value = f'{provider_name.split()[0][0]}-{npi}'  # First initial + NPI # noqa:E501
-
-        return (
-            provider_name,
-            npi,
-            specialty,
-            care_site,
-            provider_source_value,
-            specialty_source_value,
-            provider_id_source_value,
-        )
+    if workers > 1:
+        # The tables must be visible to the loader's own connections
+        conn.commit()
+        cursor.close()
+        conn.close()
 
-    rows_to_insert = [generate_row() for _ in range(MAX_NUM_ROWS)]
-
-    df = pd.DataFrame(
-        rows_to_insert,
-        columns=[
-            'provider_name',
-            'npi',
-            'specialty',
-            'care_site',
-            'provider_source_value',
-            'specialty_source_value',
-            'provider_id_source_value',
-        ],
-    )
+        db.bulk_load(
+            table='provider',
+            source=iter_provider_chunks(MAX_NUM_ROWS, chunk_size, seed),
+            workers=workers,
+            columns=PROVIDER_COLUMNS,
+            defer_indexes=True,
+        )
+        print('Database populated successfully!')
+        return
 
-    df.drop_duplicates(subset=['npi'], inplace=True)
-
-    if len(df) < MAX_NUM_ROWS:
-        additional_rows_needed = MAX_NUM_ROWS - len(df)
-        additional_rows = [
-            generate_row() for _ in range(additional_rows_needed)
-        ]
-        df_additional = pd.DataFrame(
-            additional_rows,
-            columns=[
-                'provider_name',
-                'npi',
-                'specialty',
-                'care_site',
-                'provider_source_value',
-                'specialty_source_value',
-                'provider_id_source_value',
-            ],
+    if stream:
+        # Generate and send fixed-size chunks so memory stays bounded by
+        # `chunk_size` and Postgres starts receiving rows immediately.
+        ingestion_time_start = time.time()
+        cursor.copy_expert(
+            f'COPY provider ({", ".join(PROVIDER_COLUMNS)}) '
+            + 'FROM STDIN WITH (FORMAT csv)',
+            IteratorIO(
+                _csv_chunks(
+                    iter_provider_chunks(MAX_NUM_ROWS, chunk_size, seed)
+                )
+            ),
+            size=COPY_BUFFER_SIZE,
         )
-        df = (
-            pd.concat([df, df_additional])
-            .drop_duplicates(subset=['npi'])
-            .reset_index(drop=True)
+        logger.info(
+            f'Streamed {MAX_NUM_ROWS} rows into provider table in:'
+            + f'{time.time() - ingestion_time_start} seconds.'
         )
 
+        conn.commit()
+        cursor.close()
+        conn.close()
+        print('Database populated successfully!')
+        return
+
+    generation_time_start = time.time()
+    df = generate_provider_frame(MAX_NUM_ROWS, seed=seed)
+    logger.info(
+        f'Generated {len(df)} provider rows in:'
+        + f'{time.time() - generation_time_start} seconds.'
+    )
+
     buffer = StringIO()
     df.to_csv(buffer, index=False, header=False)
     buffer.seek(0)
 
     ingestion_time_start = time.time()
-    cursor.copy_from(
-        file=buffer,
-        table='provider',
-        sep=',',
-        null='',
-        columns=df.columns,
+    # CSV format (not text with sep=',') so quoted commas survive the COPY
+    cursor.copy_expert(
+        f'COPY provider ({", ".join(df.columns)}) '
+        + 'FROM STDIN WITH (FORMAT csv)',
+        buffer,
+        size=COPY_BUFFER_SIZE,
     )
     logger.info(
         f'Inserted {len(df)} rows into provider table in:'
@@ -0,0 +1,217 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+import loguru
+from dbt.cli.main import dbtRunner, dbtRunnerResult
+
+logger = loguru.logger
+
+DBT_PROJECT_DIR = 'dbt/promptly/'
+DBT_PROFILES_DIR = 'dbt/promptly/profiles/'
+# Artifacts kept from the last successful run to compare the next one to
+STATE_ARTIFACTS = ['manifest.json', 'run_results.json', 'sources.json']
+
+
+@dataclass
+class StepTiming:
+    description: str
+    seconds: float
+    success: bool
+
+
+class DbtProject:
+    """
+    Runs dbt commands in-process through `dbtRunner`.
+
+    The project is parsed once and the manifest is handed to every later
+    invocation, so `run` and `test` skip interpreter start-up, imports
+    and parsing. `deps` drops the manifest since new packages change it.
+    With a `state_dir`, the artifacts of the last successful run are kept
+    there and `state_selection` narrows runs to what changed since.
+    Elementary's `edr` has no Python API and still runs as a subprocess,
+    straight from the virtualenv instead of through Poetry. dbtRunner is
+    not thread-safe: invoke one command at a time per process.
+    """
+
+    def __init__(
+        self,
+        project_dir: str = DBT_PROJECT_DIR,
+        profiles_dir: str = DBT_PROFILES_DIR,
+        target: str = 'trino',
+        state_dir: str | None = None,
+    ):
+        self.project_dir = project_dir
+        self.profiles_dir = profiles_dir
+        self.target = target
+        self.state_dir = state_dir
+        self.manifest = None
+        self.timings: list[StepTiming] = []
+
+    def deps(self, description: str = 'DBT Deps') -> dbtRunnerResult:
+        result = self.invoke(['deps'], description)
+        self.manifest = None
+        return result
+
+    def parse(self, description: str = 'DBT Parse') -> dbtRunnerResult:
+        result = self.invoke(['parse'], description)
+        self.manifest = result.result
+        return result
+
+    def run(self, *args: str, description: str = 'DBT Run'):
+        return self.invoke(['run', *args], description)
+
+    def test(self, *args: str, description: str = 'DBT Test'):
+        return self.invoke(['test', *args], description)
+
+    def source_freshness(self, description: str = 'DBT Source Freshness'):
+        """
+        Snapshots source freshness into `sources.json`, which the
+        `source_status:fresher+` selector compares with the saved state.
+        """
+        sources_path = os.path.join(self.target_path, 'sources.json')
+        # A file left by the last run would pass for this run's results
+        if os.path.exists(sources_path):
+            os.remove(sources_path)
+
+        try:
+            return self.invoke(['source', 'freshness'], description)
+        except RuntimeError as e:
+            if not os.path.exists(sources_path):
+                # dbt couldn't check any source, e.g. Trino is unreachable
+                raise
+            # Errors on some sources are reported, not a reason to stop
+            # the run; the others still select their models
+            logger.warning(e)
+            return None
+
+    @property
+    def has_state(self) -> bool:
+        return self.state_dir is not None and os.path.exists(
+            os.path.join(self.state_dir, 'manifest.json')
+        )
+
+    def state_selection(self) -> list[str]:
+        """
+        `--select` arguments for the models modified since the saved state
+        plus everything downstream of sources that got fresher data. Empty
+        (select everything) when there is no saved state yet.
+
+        Fresher sources are only compared when `source_freshness` wrote
+        `sources.json` in this run.
+        """
+        if not self.has_state:
+            return []
+
+        selectors = ['state:modified+']
+        if os.path.exists(
+            os.path.join(self.state_dir, 'sources.json')
+        ) and os.path.exists(os.path.join(self.target_path, 'sources.json')):
+            selectors.append('source_status:fresher+')
+        return ['--select', *selectors, '--state', self.state_dir]
+
+    def changed(self, selector: str) -> list[str]:
+        """Models matching `selector` that changed since the saved state."""
+        if not self.has_state:
+            raise RuntimeError('No saved dbt state to compare with.')
+
+        result = self.invoke(
+            [
+                'ls',
+                '--select',
+                f'state:modified,{selector}',
+                '--state',
+                self.state_dir,
+                '--resource-type',
+                'model',
+                '--output',
+                'name',
+                '--quiet',
+            ],
+            f'DBT List Modified {selector}',
+        )
+        return list(result.result or [])
+
+    def save_state(self):
+        """Keeps this run's artifacts as the state the next run compares to."""
+        if self.state_dir is None:
+            return
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        for artifact in STATE_ARTIFACTS:
+            path = os.path.join(self.target_path, artifact)
+            if os.path.exists(path):
+                shutil.copy2(path, os.path.join(self.state_dir, artifact))
+        logger.info(f'Saved dbt state to {self.state_dir}.')
+
+    @property
+    def target_path(self) -> str:
+        return os.path.join(
+            self.project_dir, os.getenv('DBT_TARGET_PATH', 'target')
+        )
+
+    def invoke(self, args: list[str], description: str) -> dbtRunnerResult:
+        if self.manifest is None and args[0] not in {'deps', 'parse'}:
+            self.parse()
+
+        logger.info(f'Running: {description}')
+        with self._timed(description) as step:
+            result = dbtRunner(manifest=self.manifest).invoke([
+                *args,
+                '--project-dir',
+                self.project_dir,
+                '--profiles-dir',
+                self.profiles_dir,
+                '--target',
+                self.target,
+            ])
+            step.success = result.success
+
+        if not result.success:
+            raise RuntimeError(
+                f'{description} failed: dbt {" ".join(args)}'
+            ) from result.exception
+        return result
+
+    def edr(self, args: list[str], description: str):
+        executable = os.path.join(os.path.dirname(sys.executable), 'edr')
+        if not os.path.exists(executable):
+            executable = shutil.which('edr') or 'edr'
+
+        logger.info(f'Running: {description}')
+        with self._timed(description) as step:
+            subprocess.run(
+                [
+                    executable,
+                    *args,
+                    '--project-dir',
+                    self.project_dir,
+                    '--profiles-dir',
+                    self.profiles_dir,
+                ],
+                check=True,
+            )
+            step.success = True
+
+    def log_timings(self):
+        for step in self.timings:
+            status = 'ok' if step.success else 'failed'
+            logger.info(f'{step.description}: {step.seconds:.2f}s ({status})')
+        logger.info(
+            f'Total: {sum(step.seconds for step in self.timings):.2f}s'
+        )
+
+    @contextmanager
+    def _timed(self, description: str) -> Iterator[StepTiming]:
+        step = StepTiming(description, 0.0, False)
+        step_time_start = time.time()
+        try:
+            yield step
+        finally:
+            step.seconds = time.time() - step_time_start
+            self.timings.append(step)
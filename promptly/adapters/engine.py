@@ -1,53 +1,522 @@
 # trino_adapter.py
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
 import loguru
+import pyarrow as pa
 from trino.dbapi import connect
 
+from promptly.adapters.query_stats import QueryStats, is_read_only
+from promptly.adapters.result_cache import ResultCache, referenced_tables
+
 logger = loguru.logger
 
+DDL_PATTERN = re.compile(
+    r'\s*(create|drop|alter|comment|rename)\b', re.IGNORECASE
+)
+
+TRINO_TO_ARROW_TYPES = {
+    'boolean': pa.bool_(),
+    'tinyint': pa.int8(),
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'real': pa.float32(),
+    'double': pa.float64(),
+    'varchar': pa.string(),
+    'char': pa.string(),
+    'json': pa.string(),
+    'uuid': pa.string(),
+    'varbinary': pa.binary(),
+    'date': pa.date32(),
+    'time': pa.time64('us'),
+    'timestamp': pa.timestamp('us'),
+}
+
+
+def arrow_type(type_code: str) -> pa.DataType | None:
+    """Arrow type for a Trino column type, None where it has to be inferred."""
+    decimal = re.fullmatch(r'decimal\((\d+),\s*(\d+)\)', type_code)
+    if decimal:
+        return pa.decimal128(int(decimal[1]), int(decimal[2]))
+    if type_code.startswith('timestamp') and type_code.endswith('time zone'):
+        return pa.timestamp('us', tz='UTC')
+    return TRINO_TO_ARROW_TYPES.get(re.split(r'[(\s]', type_code)[0])
+
+
+@dataclass
+class QueryRun:
+    query: str
+    seconds: float | None = None
+    rows: list | None = None
+    error: Exception | None = None
+    skipped: bool = False
+
+
+class MetadataCache:
+    """
+    Thread-safe TTL cache for catalog metadata listings.
+
+    Keys are tuples like ('tables', catalog, schema), so everything under
+    a catalog or schema can be invalidated by key prefix.
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: tuple, load: Callable[[], list]) -> list:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+        value = load()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        return value
+
+    def add(self, key: tuple, item):
+        """Adds `item` to a cached listing, if that listing is cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and item not in entry[1]:
+                entry[1].append(item)
+
+    def invalidate(self, *prefix: str):
+        """Drops entries whose key path starts with `prefix` (all if empty)."""
+        with self._lock:
+            for key in list(self._entries):
+                # Key paths skip the listing kind, e.g. ('tables', c, s)
+                if key[1 : len(prefix) + 1] == prefix:
+                    del self._entries[key]
+
 
 class TrinoCluster:
-    def __init__(
+    def __init__(  # noqa: PLR0913, PLR0917
         self,
         host: str,
         port: int,
         user: str,
+        max_connections: int = 8,
+        checkout_timeout: float | None = 30,
+        stats_hooks: list[Callable[[QueryStats], None]] | None = None,
+        explain_analyze_after_seconds: float | None = None,
+        metadata_ttl_seconds: float = 300,
+        result_cache: ResultCache | None = None,
     ):
-        self.conn = connect(
-            host=host,
-            port=port,
-            user=user,
+        self.host = host
+        self.port = port
+        self.user = user
+        self.max_connections = max_connections
+        self.checkout_timeout = checkout_timeout
+        self.stats_hooks = stats_hooks or []
+        self.explain_analyze_after_seconds = explain_analyze_after_seconds
+        self.metadata = MetadataCache(metadata_ttl_seconds)
+        self.result_cache = result_cache
+        # Connections are opened on demand and reused LIFO, so a burst of
+        # concurrent queries doesn't leave many idle HTTP sessions behind
+        self._pool = queue.LifoQueue()
+        self._slots = queue.Queue()
+        for _ in range(max_connections - 1):
+            self._slots.put(None)
+        self.conn = self._connect()
+        self._pool.put(self.conn)
+
+    def _connect(self):
+        return connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+        )
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks a connection out of the pool for the block's duration.
+
+        Waits at most `checkout_timeout` seconds (None waits forever) for
+        one to be returned once all `max_connections` are in use.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            try:
+                self._slots.get_nowait()
+                conn = self._connect()
+            except queue.Empty:
+                conn = self._wait_for_connection()
+
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _wait_for_connection(self):
+        try:
+            return self._pool.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            # Usually a thread asking for a second connection while it
+            # holds one, e.g. a query inside a loop over iter_query
+            raise TimeoutError(
+                f'No Trino connection free after {self.checkout_timeout}s; '
+                + f'all {self.max_connections} are checked out.'
+            ) from None
+
+    def list_catalogs(self) -> list[str]:
+        return self.metadata.get_or_load(
+            ('catalogs',),
+            lambda: [row[0] for row in self._execute('SHOW CATALOGS')],
+        )
+
+    def list_schemas(self, catalog: str) -> list[str]:
+        catalog = catalog.lower()
+        return self.metadata.get_or_load(
+            ('schemas', catalog),
+            lambda: [
+                row[0] for row in self._execute(f'SHOW SCHEMAS FROM {catalog}')
+            ],
+        )
+
+    def list_tables(self, catalog: str, schema: str) -> list[str]:
+        catalog, schema = catalog.lower(), schema.lower()
+        return self.metadata.get_or_load(
+            ('tables', catalog, schema),
+            lambda: [
+                row[0]
+                for row in self._execute(
+                    f'SHOW TABLES FROM {catalog}.{schema}'
+                )
+            ],
+        )
+
+    def list_columns(
+        self,
+        catalog: str,
+        schema: str,
+        table: str,
+    ) -> list[tuple[str, str]]:
+        """(name, type) of each column of the table."""
+        catalog, schema, table = catalog.lower(), schema.lower(), table.lower()
+        return self.metadata.get_or_load(
+            ('columns', catalog, schema, table),
+            lambda: [
+                (row[0], row[1])
+                for row in self._execute(
+                    f'SHOW COLUMNS FROM {catalog}.{schema}.{table}'
+                )
+            ],
         )
 
-    def list_catalogs(self):
-        with self.conn.cursor() as cursor:
-            cursor.execute('SHOW CATALOGS')
-            catalogs = [row[0] for row in cursor.fetchall()]
-        return catalogs
+    def invalidate_metadata(self, *path: str):
+        """
+        Forgets cached metadata under a (catalog, schema, table) path, or
+        everything when no path is given.
+        """
+        self.metadata.invalidate(*[name.lower() for name in path])
 
     def create_catalog_if_not_exists(
         self,
         catalog_name: str,
         creation_sql: str,
     ):
-        with self.conn.cursor() as cursor:
-            if catalog_name not in self.list_catalogs():
-                cursor.execute(creation_sql)
-                self.conn.commit()
-                logger.info(
-                    f"Catalog '{catalog_name}' created successfully in Trino."
-                )
+        if catalog_name not in self.list_catalogs():
+            self.execute_query(creation_sql)
+            logger.info(
+                f"Catalog '{catalog_name}' created successfully in Trino."
+            )
 
-            else:
-                logger.info(
-                    f"Catalog '{catalog_name}' already exists in Trino."
+        else:
+            logger.info(f"Catalog '{catalog_name}' already exists in Trino.")
+
+    def ensure_schema(
+        self,
+        catalog: str,
+        schema: str,
+        properties: dict | None = None,
+    ) -> bool:
+        """
+        Creates `catalog.schema` with the given properties unless the
+        cached listing already has it. Returns whether it was created.
+        """
+        catalog, schema = catalog.lower(), schema.lower()
+        if schema in self.list_schemas(catalog):
+            return False
+
+        query = f'CREATE SCHEMA IF NOT EXISTS {catalog}.{schema}'
+        if properties:
+            query += (
+                ' WITH ('
+                + ', '.join(
+                    f'{name} = {_sql_literal(value)}'
+                    for name, value in properties.items()
                 )
-            cursor.close()
+                + ')'
+            )
+        self._execute(query)
+
+        self.metadata.add(('schemas', catalog), schema)
+        logger.info(f"Schema '{catalog}.{schema}' created in Trino.")
+        return True
+
+    def ensure_table(
+        self,
+        catalog: str,
+        schema: str,
+        table: str,
+        creation_sql: str,
+    ) -> bool:
+        """
+        Runs `creation_sql` unless the cached listing of `catalog.schema`
+        already has `table`. Returns whether it was created.
+        """
+        catalog, schema, table = catalog.lower(), schema.lower(), table.lower()
+        if table in self.list_tables(catalog, schema):
+            return False
+
+        self._execute(creation_sql)
+
+        self.metadata.add(('tables', catalog, schema), table)
+        logger.info(f"Table '{catalog}.{schema}.{table}' created in Trino.")
+        return True
 
     def execute_query(self, query: str):
-        with self.conn.cursor() as cursor:
+        results = self._execute(query)
+        if DDL_PATTERN.match(query):
+            # The statement may change any catalog listing
+            self.metadata.invalidate()
+        return results
+
+    def _execute(self, query: str):
+        with self.connection() as conn, conn.cursor() as cursor:
             cursor.execute(query)
             results = cursor.fetchall()
+            stats = self._query_stats(cursor, query)
+        # Recorded once the connection is back in the pool: EXPLAIN ANALYZE
+        # checks out another one
+        self._record_stats(stats)
         return results
 
+    def _query_stats(self, cursor, query: str) -> QueryStats | None:
+        """Reads the finished query's stats off its cursor, if wanted."""
+        if not self.stats_hooks:
+            return None
+        return QueryStats.from_cursor(cursor, query)
+
+    def _record_stats(self, stats: QueryStats | None):
+        """
+        Hands the finished query's stats to every stats hook. Call it with
+        no connection checked out, or a full pool deadlocks on the
+        EXPLAIN ANALYZE connection.
+        """
+        if stats is None:
+            return
+
+        if (
+            self.explain_analyze_after_seconds is not None
+            and stats.elapsed_seconds >= self.explain_analyze_after_seconds
+            and stats.is_read_only
+        ):
+            # Runs the query a second time, hence read-only queries only
+            try:
+                with self.connection() as conn, conn.cursor() as explain:
+                    explain.execute(f'EXPLAIN ANALYZE {stats.query}')
+                    stats.explain_analyze = '\n'.join(
+                        row[0] for row in explain.fetchall()
+                    )
+            except Exception as e:
+                logger.warning(f'EXPLAIN ANALYZE of {stats.query_id}: {e}')
+
+        for hook in self.stats_hooks:
+            try:
+                hook(stats)
+            except Exception as e:
+                logger.warning(f'Query stats hook {hook} failed: {e}')
+
+    def run_many(
+        self,
+        queries: Iterable[str],
+        max_concurrency: int | None = None,
+        fail_fast: bool = True,
+    ) -> list[QueryRun]:
+        """
+        Runs independent statements concurrently on pooled connections.
+
+        Returns one `QueryRun` per query, in order, with its timing and
+        rows or error. With `fail_fast`, statements that haven't started
+        when one fails are skipped and the first error is raised once the
+        running ones finish; otherwise every statement runs and errors are
+        only recorded.
+        """
+        runs = [QueryRun(query) for query in queries]
+        failed = []
+
+        def run(query_run: QueryRun):
+            if fail_fast and failed:
+                query_run.skipped = True
+                return
+            query_time_start = time.time()
+            try:
+                query_run.rows = self.execute_query(query_run.query)
+            except Exception as e:
+                query_run.error = e
+                failed.append(query_run)
+            query_run.seconds = time.time() - query_time_start
+
+        run_many_time_start = time.time()
+        with ThreadPoolExecutor(
+            max_workers=max_concurrency or self.max_connections
+        ) as executor:
+            list(executor.map(run, runs))
+
+        for query_run in runs:
+            if query_run.skipped:
+                status = 'skipped'
+            elif query_run.error is not None:
+                status = f'failed in {query_run.seconds:.2f}s'
+            else:
+                status = f'done in {query_run.seconds:.2f}s'
+            logger.info(f'{status}: {" ".join(query_run.query.split())[:80]}')
+        logger.info(
+            f'Ran {len(runs)} queries in: '
+            + f'{time.time() - run_many_time_start} seconds, '
+            + f'{len(failed)} failed.'
+        )
+
+        if fail_fast and failed:
+            raise failed[0].error
+        return runs
+
+    def iter_query(
+        self,
+        query: str,
+        batch_size: int = 10_000,
+        as_arrow: bool = False,
+    ) -> Iterator[list | pa.RecordBatch]:
+        """
+        Yields the result of `query` in batches of at most `batch_size` rows.
+
+        Rows are fetched as Trino serves result pages, so only one batch is
+        held in memory at a time. With `as_arrow`, batches are Arrow record
+        batches typed from the result columns. Closing the generator early
+        cancels the query.
+        """
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query)
+            schema = None
+
+            while rows := cursor.fetchmany(batch_size):
+                if not as_arrow:
+                    yield rows
+                    continue
+
+                columns = list(zip(*rows))
+                if schema is None:
+                    schema = pa.schema([
+                        (
+                            column.name,
+                            arrow_type(column.type_code)
+                            or pa.array(values).type,
+                        )
+                        for column, values in zip(cursor.description, columns)
+                    ])
+                yield pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(values, type=field.type)
+                        for values, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+
+            stats = self._query_stats(cursor, query)
+
+            if as_arrow and schema is None:
+                # Empty result: still hand out the column names and types
+                yield pa.RecordBatch.from_pylist(
+                    [],
+                    schema=pa.schema([
+                        (
+                            column.name,
+                            arrow_type(column.type_code) or pa.null(),
+                        )
+                        for column in cursor.description or []
+                    ]),
+                )
+
+        self._record_stats(stats)
+
+    def to_arrow(
+        self,
+        query: str,
+        batch_size: int = 10_000,
+        cache: bool = False,
+    ) -> pa.Table:
+        """
+        Reads the result of `query` into an Arrow table batch by batch.
+
+        With `cache` (and a result cache configured), read-only queries
+        over fully qualified Iceberg tables are served from the cache as
+        long as none of those tables has a new snapshot.
+        """
+        snapshots = None
+        if cache and self.result_cache is not None and is_read_only(query):
+            snapshots = self._current_snapshots(query)
+
+        if snapshots is not None:
+            key = self.result_cache.key(query, snapshots)
+            table = self.result_cache.get(key)
+            if table is not None:
+                logger.info(f'Result cache hit for query {key[:12]}.')
+                return table
+
+        table = pa.Table.from_batches(
+            self.iter_query(query, batch_size, as_arrow=True)
+        )
+        if snapshots is not None:
+            self.result_cache.put(key, table)
+        return table
+
+    def _current_snapshots(self, query: str) -> dict | None:
+        """
+        Current Iceberg snapshot id of each table `query` reads, or None
+        when any of them can't be pinned (unqualified, not Iceberg).
+        """
+        tables = referenced_tables(query)
+        if not tables:
+            return None
+
+        snapshots = {}
+        for table in tables:
+            catalog, schema, name = table.split('.')
+            try:
+                rows = self._execute(
+                    'SELECT snapshot_id '
+                    + f'FROM {catalog}.{schema}."{name}$history" '
+                    + 'WHERE is_current_ancestor '
+                    + 'ORDER BY made_current_at DESC LIMIT 1'
+                )
+            except Exception as e:
+                logger.debug(f'Not caching, no snapshot for {table}: {e}')
+                return None
+            snapshots[table] = rows[0][0] if rows else None
+        return snapshots
+
     def close(self):
-        self.conn.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+def _sql_literal(value) -> str:
+    if isinstance(value, str):
+        escaped = value.replace("'", "''")
+        return f"'{escaped}'"
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
@@ -1,35 +1,849 @@
+import os
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
 import loguru
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from promptly.adapters.streams import IteratorIO
 
 logger = loguru.logger
 
+BULK_LOAD_CHUNK_SIZE = 100_000
+COPY_BUFFER_SIZE = 1 << 20
+COPY_TO_BLOCK_SIZE = 16 << 20
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# Postgres binary dates and timestamps count from 2000-01-01
+POSTGRES_EPOCH_DAYS = 10_957
+POSTGRES_EPOCH_MICROS = POSTGRES_EPOCH_DAYS * 86_400 * 1_000_000
+
+PG_TO_ARROW_TYPES = {
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'real': pa.float32(),
+    'double precision': pa.float64(),
+    'boolean': pa.bool_(),
+    'text': pa.string(),
+    'character varying': pa.string(),
+    'character': pa.string(),
+    'bytea': pa.binary(),
+    'date': pa.date32(),
+    'timestamp without time zone': pa.timestamp('us'),
+    'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+}
+
+Frame = pd.DataFrame | pa.RecordBatch | pa.Table
+
+
+class _SharedFrames:
+    """
+    Hands out frames from one source to several COPY workers.
+
+    Workers pull the next chunk as soon as they are free, so partitions
+    balance themselves. Once `abort()` is called every worker sees the
+    source as exhausted and finishes its COPY early.
+    """
+
+    def __init__(self, frames: Iterable[Frame]):
+        self._frames = iter(frames)
+        self._lock = threading.Lock()
+        self._aborted = threading.Event()
+
+    def abort(self):
+        self._aborted.set()
+
+    def __iter__(self) -> Iterator[Frame]:
+        while not self._aborted.is_set():
+            with self._lock:
+                df = next(self._frames, None)
+            if df is None:
+                return
+            yield df
+
+
+def _iter_frames(
+    source: Frame | Iterable[Frame],
+    chunk_size: int,
+) -> Iterator[Frame]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start : start + chunk_size]
+    elif isinstance(source, pa.Table):
+        yield from source.to_batches(max_chunksize=chunk_size)
+    elif isinstance(source, pa.RecordBatch):
+        yield source
+    else:
+        yield from source
+
+
+def iter_csv_copy(frames: Iterable[Frame]) -> Iterator[bytes]:
+    """Yields `frames` as CSV COPY data, one chunk per frame."""
+    for frame in frames:
+        df = frame if isinstance(frame, pd.DataFrame) else frame.to_pandas()
+        yield df.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _decode_bytea(column: pa.Array) -> pa.Array:
+    """Decodes Postgres hex-format bytea text ('\\x...') into binary."""
+    return pa.array(
+        [
+            None if value is None else bytes.fromhex(value[2:])
+            for value in column.to_pylist()
+        ],
+        type=pa.binary(),
+    )
+
+
+def _binary_field(
+    column: pa.Array,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, int | None]:
+    """
+    Returns the wire payload of one column for binary COPY.
+
+    The result is (payload bytes, start of each value in the payload,
+    length of each value with -1 for NULL, fixed value width or None).
+    """
+    type_ = column.type
+    if pa.types.is_dictionary(type_):
+        column = column.dictionary_decode()
+        type_ = column.type
+
+    valid = column.is_valid().to_numpy(zero_copy_only=False)
+
+    if (
+        pa.types.is_string(type_)
+        or pa.types.is_large_string(type_)
+        or (pa.types.is_binary(type_) or pa.types.is_large_binary(type_))
+    ):
+        column = column.cast(pa.large_binary())
+        _, offsets_buffer, data_buffer = column.buffers()
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[
+            column.offset : column.offset + len(column) + 1
+        ]
+        payload = (
+            np.frombuffer(data_buffer, dtype=np.uint8)
+            if data_buffer is not None
+            else np.empty(0, dtype=np.uint8)
+        )
+        lengths = np.where(valid, np.diff(offsets), -1)
+        return payload, offsets[:-1], lengths, None
+
+    if pa.types.is_boolean(type_):
+        values = pc.fill_null(column, False).to_numpy(zero_copy_only=False)
+        values = values.astype(np.uint8)
+    elif pa.types.is_date32(type_):
+        values = pc.fill_null(column.cast(pa.int32()), 0).to_numpy()
+        values = (values - POSTGRES_EPOCH_DAYS).astype('>i4')
+    elif pa.types.is_timestamp(type_):
+        micros = column.cast(pa.timestamp('us', tz=type_.tz))
+        values = pc.fill_null(micros.cast(pa.int64()), 0).to_numpy()
+        values = (values - POSTGRES_EPOCH_MICROS).astype('>i8')
+    elif pa.types.is_signed_integer(type_) or pa.types.is_floating(type_):
+        values = pc.fill_null(column, 0).to_numpy()
+        values = values.astype(values.dtype.newbyteorder('>'))
+    else:
+        raise TypeError(f'Unsupported Arrow type for binary COPY: {type_}')
+
+    width = values.dtype.itemsize
+    lengths = np.where(valid, width, -1)
+    starts = np.arange(len(values), dtype=np.int64) * width
+    return values.view(np.uint8), starts, lengths, width
+
+
+def _put_fixed(out: np.ndarray, positions: np.ndarray, values: np.ndarray):
+    width = values.dtype.itemsize
+    out[positions[:, None] + np.arange(width)] = values.view(np.uint8).reshape(
+        -1, width
+    )
+
+
+def encode_binary_copy(batch: pa.RecordBatch) -> bytes:
+    """
+    Encodes `batch` as binary COPY tuples, without header or trailer.
+
+    Column types must match the target columns exactly: binary COPY does
+    no coercion on the server.
+    """
+    num_rows = batch.num_rows
+    fields = [_binary_field(column) for column in batch.columns]
+
+    row_sizes = np.full(num_rows, 2, dtype=np.int64)
+    for _, _, lengths, _ in fields:
+        row_sizes += 4 + np.maximum(lengths, 0)
+    row_starts = np.zeros(num_rows, dtype=np.int64)
+    np.cumsum(row_sizes[:-1], out=row_starts[1:])
+
+    out = np.empty(int(row_sizes.sum()), dtype=np.uint8)
+    _put_fixed(out, row_starts, np.full(num_rows, len(fields), dtype='>i2'))
+
+    positions = row_starts + 2
+    for payload, starts, lengths, width in fields:
+        _put_fixed(out, positions, lengths.astype('>i4'))
+        positions += 4
+
+        present = lengths > 0
+        if width is not None:
+            out[positions[present, None] + np.arange(width)] = payload.reshape(
+                -1, width
+            )[present]
+        else:
+            value_lengths = lengths[present]
+            total = int(value_lengths.sum())
+            if total:
+                # Gather every byte of every value in one vectorized copy
+                within = np.arange(total) - np.repeat(
+                    np.cumsum(value_lengths) - value_lengths, value_lengths
+                )
+                out[np.repeat(positions[present], value_lengths) + within] = (
+                    payload[np.repeat(starts[present], value_lengths) + within]
+                )
+        positions += np.maximum(lengths, 0)
+
+    return out.tobytes()
+
+
+def iter_binary_copy(
+    frames: Iterable[Frame],
+    schema: pa.Schema,
+) -> Iterator[bytes]:
+    """Yields a complete binary COPY stream for `frames` cast to `schema`."""
+    yield PGCOPY_HEADER
+    for frame in frames:
+        if isinstance(frame, pd.DataFrame):
+            batches = [pa.RecordBatch.from_pandas(frame, preserve_index=False)]
+        elif isinstance(frame, pa.Table):
+            batches = frame.to_batches()
+        else:
+            batches = [frame]
+
+        for batch in batches:
+            yield encode_binary_copy(batch.select(schema.names).cast(schema))
+    yield PGCOPY_TRAILER
+
+
+class PoolMetrics:
+    """
+    Checkout timings for a connection pool.
+
+    Checkout latency is the full time `pool.connect()` took. Connect time
+    is the part spent opening new server connections; the remainder is
+    reported as wait time (queueing for a free connection plus pre-ping).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.connections_created = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+        self.connect_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_in_use = 0
+
+    def start_checkout(self):
+        self._local.connect_seconds = 0.0
+
+    def record_connect(self, seconds: float):
+        self._local.connect_seconds = (
+            getattr(self._local, 'connect_seconds', 0.0) + seconds
+        )
+        with self._lock:
+            self.connections_created += 1
+            self.connect_seconds += seconds
+
+    def record_checkout(self, seconds: float, in_use: int):
+        wait = max(seconds - self._local.connect_seconds, 0.0)
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            checkouts = max(self.checkouts, 1)
+            return {
+                'checkouts': self.checkouts,
+                'connections_created': self.connections_created,
+                'avg_checkout_seconds': self.checkout_seconds / checkouts,
+                'max_checkout_seconds': self.max_checkout_seconds,
+                'avg_wait_seconds': self.wait_seconds / checkouts,
+                'max_wait_seconds': self.max_wait_seconds,
+                'total_wait_seconds': self.wait_seconds,
+                'peak_in_use': self.peak_in_use,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout latency into `self.metrics`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        checkout_time_start = time.perf_counter()
+        self.metrics.start_checkout()
+        connection = super().connect()
+        self.metrics.record_checkout(
+            time.perf_counter() - checkout_time_start, self.checkedout()
+        )
+        return connection
+
+    def _create_connection(self):
+        connect_time_start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self.metrics.record_connect(
+                time.perf_counter() - connect_time_start
+            )
+
+
+class _WorkerTransactions:
+    """
+    The open transactions of the `bulk_load` workers.
+
+    With `two_phase`, every transaction is prepared before any commits:
+    a failure up to the last prepare rolls all of them back, and once all
+    are prepared the load is decided and only COMMIT PREPARED remains.
+    Without it they commit one after another, so a failing commit leaves
+    the earlier ones committed.
+    """
+
+    def __init__(self, connections: list, two_phase: bool):
+        self.connections = connections
+        self.two_phase = two_phase
+        self.committed = 0
+        self.prepared = False
+        self.xids = []
+        if two_phase:
+            load_id = uuid.uuid4().hex
+            for index, connection in enumerate(connections):
+                xid = f'promptly_bulk_load_{load_id}_{index}'
+                connection.tpc_begin(xid)
+                self.xids.append(xid)
+
+    def commit(self):
+        if self.two_phase:
+            for connection in self.connections:
+                connection.tpc_prepare()
+            self.prepared = True
+        for connection in self.connections:
+            if self.two_phase:
+                connection.tpc_commit()
+            else:
+                connection.commit()
+            self.committed += 1
+
+    def rollback(self) -> str:
+        """Rolls back what still can be and describes the outcome."""
+        pending = self.connections[self.committed :]
+        if self.prepared:
+            # Prepared transactions outlive their connection; the decision
+            # to commit them was already taken
+            return (
+                f'{len(pending)} prepared worker transactions still need '
+                + 'COMMIT PREPARED: '
+                + ', '.join(self.xids[self.committed :])
+            )
+        for connection in pending:
+            if self.two_phase:
+                connection.tpc_rollback()
+            else:
+                connection.rollback()
+        return (
+            f'rolled back {len(pending)} of {len(self.connections)} '
+            + 'worker transactions'
+        )
+
 
 class HealthCareDB:
-    def __init__(
+    def __init__(  # noqa: PLR0913, PLR0917
         self,
         user: str,
         password: str,
         host: str,
         port: int,
         db_name: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        statement_timeout_ms: int | None = None,
     ):
         self.user = user
         self.password = password
         self.host = host
         self.port = port
         self.db_name = db_name
+        # Most connections the pool hands out at once
+        self.max_connections = pool_size + max_overflow
+
+        connect_args = {}
+        if statement_timeout_ms:
+            connect_args['options'] = (
+                f'-c statement_timeout={statement_timeout_ms}'
+            )
+
         self.engine = create_engine(
-            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.db_name}'
+            f'postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.db_name}',
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
         )
 
-    def execute_query(self, query: str):
+    def pool_metrics(self) -> dict:
+        pool = self.engine.pool
+        return {
+            'pool_size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+            **pool.metrics.snapshot(),
+        }
+
+    def execute_query(self, query: str, snapshot: str | None = None):
+        """
+        Runs `query` and returns all rows. `snapshot` reads as of a
+        snapshot from `exported_snapshot()`.
+        """
         with self.engine.connect() as connection:
+            if snapshot:
+                connection.execute(
+                    text('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                )
+                connection.execute(
+                    text(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                )
             result = connection.execute(text(query))
             return result.fetchall()
 
+    def iter_query(
+        self,
+        query: str,
+        batch_size: int = 10_000,
+        as_arrow: bool = False,
+        schema: pa.Schema | None = None,
+    ) -> Iterator[list | pa.RecordBatch]:
+        """
+        Yields the result of `query` in batches of at most `batch_size` rows.
+
+        Rows are read through a named server-side cursor, so only one batch
+        is held in memory at a time. With `as_arrow`, batches are Arrow
+        record batches; pass `schema` to pin column types instead of
+        inferring them per batch.
+        """
+        with self.engine.connect().execution_options(
+            stream_results=True,
+            yield_per=batch_size,
+        ) as connection:
+            result = connection.execute(text(query))
+            names = list(result.keys())
+
+            for rows in result.partitions(batch_size):
+                if not as_arrow:
+                    yield rows
+                    continue
+
+                columns = list(zip(*rows))
+                if schema is not None:
+                    yield pa.RecordBatch.from_arrays(
+                        [
+                            pa.array(column, type=field.type)
+                            for column, field in zip(columns, schema)
+                        ],
+                        schema=schema,
+                    )
+                else:
+                    yield pa.RecordBatch.from_arrays(
+                        [pa.array(column) for column in columns],
+                        names=names,
+                    )
+
     def close(self):
         self.engine.dispose()
 
+    def bulk_load(  # noqa: PLR0913, PLR0917
+        self,
+        table: str,
+        source: Frame | Iterable[Frame],
+        workers: int = 4,
+        columns: list[str] | None = None,
+        defer_indexes: bool = False,
+        chunk_size: int = BULK_LOAD_CHUNK_SIZE,
+        copy_format: str = 'csv',
+    ) -> int:
+        """
+        COPYs `source` into `table` over `workers` pooled connections.
+
+        `source` is a DataFrame or Arrow table, which is cut into
+        `chunk_size` partitions, or any iterable of DataFrames/Arrow record
+        batches. Every worker keeps its transaction open until all
+        partitions are loaded; then all of them commit, or all of them
+        roll back if any partition failed. When the server allows enough
+        prepared transactions (`max_prepared_transactions`), this is a
+        single two-phase commit point. Otherwise the workers commit one
+        after another, and if a later commit fails, rows from the workers
+        that already committed are kept.
+
+        `copy_format` is 'csv' or 'binary'. Binary skips text encoding and
+        parsing entirely; frames are cast to the table's column types.
+
+        With `defer_indexes`, indexes and index-backed/foreign key
+        constraints are dropped before loading and rebuilt afterwards.
+        Rows violating them are only found by the rebuild, once they are
+        committed: it then raises with the DDL still to run logged.
+        """
+        frames = _SharedFrames(_iter_frames(source, chunk_size))
+        copy_sql, encode = self._copy_from(table, source, columns, copy_format)
+
+        recreate_statements = []
+        connections = []
+        transactions = None
+
+        def copy_partition(connection) -> int:
+            copy_time_start = time.time()
+            cursor = connection.cursor()
+            try:
+                # Rows with the same unique key in two open transactions
+                # would otherwise wait on each other until the final commit
+                cursor.execute("SET LOCAL lock_timeout = '30s'")
+                cursor.copy_expert(
+                    copy_sql,
+                    IteratorIO(encode(frames)),
+                    size=COPY_BUFFER_SIZE,
+                )
+                rows = cursor.rowcount
+            except Exception:
+                frames.abort()
+                raise
+            finally:
+                cursor.close()
+            logger.info(
+                f'Worker copied {rows} rows into {table} in:'
+                + f'{time.time() - copy_time_start} seconds.'
+            )
+            return rows
+
+        load_time_start = time.time()
+        load_failed = False
+        try:
+            # Checked before the workers hold every pooled connection
+            two_phase = self._supports_two_phase(workers)
+            if defer_indexes:
+                recreate_statements = self._drop_indexes(table)
+            connections.extend(
+                self.engine.raw_connection() for _ in range(workers)
+            )
+            transactions = _WorkerTransactions(connections, two_phase)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(copy_partition, connection)
+                    for connection in connections
+                ]
+            total_rows = sum(future.result() for future in futures)
+
+            transactions.commit()
+        except Exception:
+            load_failed = True
+            outcome = (
+                transactions.rollback()
+                if transactions is not None
+                else 'nothing was loaded'
+            )
+            logger.error(f'Bulk load into {table} failed, {outcome}.')
+            raise
+        finally:
+            for connection in connections:
+                connection.close()
+            if recreate_statements:
+                # Never replaces the load's own error
+                self._recreate_indexes(
+                    table, recreate_statements, raise_errors=not load_failed
+                )
+
+        logger.info(
+            f'Bulk loaded {total_rows} rows into {table} with {workers} '
+            + f'workers in: {time.time() - load_time_start} seconds.'
+        )
+        return total_rows
+
+    def iter_copy_batches(
+        self,
+        query: str,
+        schema: pa.Schema,
+        block_size: int = COPY_TO_BLOCK_SIZE,
+        snapshot: str | None = None,
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Yields the result of `query` as Arrow record batches via COPY TO.
+
+        Postgres streams CSV through a pipe that pyarrow parses in native
+        code, so rows never become Python objects. `schema` gives the
+        column names and types of the result, e.g. from `arrow_schema()`.
+        `snapshot` reads as of a snapshot from `exported_snapshot()`.
+        """
+        read_fd, write_fd = os.pipe()
+        errors = []
+
+        def copy_to_pipe():
+            try:
+                with os.fdopen(write_fd, 'wb') as pipe:
+                    connection = self.engine.raw_connection()
+                    try:
+                        cursor = connection.cursor()
+                        if snapshot:
+                            cursor.execute(
+                                'SET TRANSACTION ISOLATION LEVEL '
+                                + 'REPEATABLE READ'
+                            )
+                            cursor.execute(
+                                f"SET TRANSACTION SNAPSHOT '{snapshot}'"
+                            )
+                        cursor.execute("SET LOCAL TimeZone = 'UTC'")
+                        cursor.copy_expert(
+                            f'COPY ({query}) TO STDOUT WITH (FORMAT csv)',
+                            pipe,
+                            size=COPY_BUFFER_SIZE,
+                        )
+                        cursor.close()
+                        connection.rollback()
+                    finally:
+                        connection.close()
+            except BrokenPipeError:
+                # The consumer stopped early and closed its end of the pipe
+                pass
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=copy_to_pipe, daemon=True)
+        writer.start()
+
+        with os.fdopen(read_fd, 'rb') as pipe:
+            try:
+                yield from self._read_copy_csv(pipe, schema, block_size)
+            finally:
+                pipe.close()
+                writer.join()
+
+        if errors:
+            raise errors[0]
+
+    @contextmanager
+    def exported_snapshot(self) -> Iterator[str]:
+        """
+        Holds a REPEATABLE READ transaction open and yields its snapshot
+        id, so reads on other connections can share one consistent view.
+        """
+        with self.engine.connect().execution_options(
+            isolation_level='REPEATABLE READ'
+        ) as connection:
+            yield connection.execute(
+                text('SELECT pg_export_snapshot()')
+            ).scalar()
+            connection.rollback()
+
+    @staticmethod
+    def _read_copy_csv(
+        pipe,
+        schema: pa.Schema,
+        block_size: int,
+    ) -> Iterator[pa.RecordBatch]:
+        # bytea arrives hex encoded ('\\x...'), so it is parsed as text
+        # and decoded per batch
+        bytea_columns = [
+            field.name for field in schema if pa.types.is_binary(field.type)
+        ]
+        csv_schema = pa.schema([
+            (field.name, pa.string()) if field.name in bytea_columns else field
+            for field in schema
+        ])
+
+        try:
+            reader = pa_csv.open_csv(
+                pipe,
+                read_options=pa_csv.ReadOptions(
+                    column_names=schema.names,
+                    block_size=block_size,
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=csv_schema,
+                    true_values=['t'],
+                    false_values=['f'],
+                    # COPY writes NULL unquoted and '' quoted; nothing
+                    # else (e.g. 'NULL' or 'NaN' text) may become null
+                    null_values=[''],
+                    strings_can_be_null=True,
+                    quoted_strings_can_be_null=False,
+                ),
+            )
+        except pa.ArrowInvalid as e:
+            if 'Empty CSV file' in str(e):
+                return
+            raise
+
+        for batch in reader:
+            if not bytea_columns:
+                yield batch
+                continue
+
+            yield pa.RecordBatch.from_arrays(
+                [
+                    _decode_bytea(column) if name in bytea_columns else column
+                    for name, column in zip(schema.names, batch.columns)
+                ],
+                schema=schema,
+            )
+
+    def arrow_schema(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+    ) -> pa.Schema:
+        """Arrow schema matching the Postgres column types of `table`."""
+        rows = self.execute_query(f"""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = '{table}'
+            ORDER BY ordinal_position
+        """)
+        types = dict(rows)
+        if columns is None:
+            columns = list(types)
+
+        unsupported = {
+            types[name]
+            for name in columns
+            if types[name] not in PG_TO_ARROW_TYPES
+        }
+        if unsupported:
+            raise TypeError(
+                f'No Arrow mapping for {table} column types: {unsupported}'
+            )
+
+        return pa.schema([
+            (name, PG_TO_ARROW_TYPES[types[name]]) for name in columns
+        ])
+
+    def _drop_indexes(self, table: str) -> list[str]:
+        """Drops indexes on `table` and returns the DDL to rebuild them."""
+        constraints = self.execute_query(f"""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = '{table}'::regclass
+                AND contype IN ('p', 'u', 'x', 'f')
+            ORDER BY contype = 'f'
+        """)
+        indexes = self.execute_query(f"""
+            SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+            FROM pg_index
+            WHERE indrelid = '{table}'::regclass
+                AND NOT EXISTS (
+                    SELECT 1 FROM pg_constraint
+                    WHERE conindid = pg_index.indexrelid
+                )
+        """)
+
+        self._run_in_transaction(
+            [
+                f'ALTER TABLE {table} DROP CONSTRAINT {name}'
+                for name, _ in reversed(constraints)
+            ]
+            + [f'DROP INDEX {name}' for name, _ in indexes]
+        )
+        logger.info(
+            f'Deferred {len(constraints)} constraints and {len(indexes)} '
+            + f'indexes on {table}.'
+        )
+
+        return [
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+            for name, definition in constraints
+        ] + [definition for _, definition in indexes]
+
+    def _copy_from(
+        self,
+        table: str,
+        source: Frame | Iterable[Frame],
+        columns: list[str] | None,
+        copy_format: str,
+    ):
+        """The COPY FROM statement for `table` and its frame encoder."""
+        if columns is None and isinstance(source, pd.DataFrame):
+            columns = list(source.columns)
+        elif columns is None and isinstance(source, pa.Table):
+            columns = source.column_names
+        column_list = f' ({", ".join(columns)})' if columns else ''
+        copy_sql = (
+            f'COPY {table}{column_list} FROM STDIN '
+            + f'WITH (FORMAT {copy_format})'
+        )
+
+        if copy_format != 'binary':
+            return copy_sql, iter_csv_copy
+
+        schema = self.arrow_schema(table, columns)
+
+        def encode(frames: Iterable[Frame]) -> Iterator[bytes]:
+            return iter_binary_copy(frames, schema)
+
+        return copy_sql, encode
+
+    def _supports_two_phase(self, workers: int) -> bool:
+        [(setting,)] = self.execute_query('SHOW max_prepared_transactions')
+        return int(setting) >= workers
+
+    def _recreate_indexes(
+        self,
+        table: str,
+        statements: list[str],
+        raise_errors: bool = True,
+    ):
+        try:
+            self._run_in_transaction(statements)
+        except Exception as e:
+            logger.error(
+                f'Rebuilding indexes of {table} failed ({e}); fix the data '
+                + 'and run:\n'
+                + '\n'.join(f'{statement};' for statement in statements)
+            )
+            if raise_errors:
+                raise RuntimeError(
+                    f'Rebuilding indexes of {table} failed.'
+                ) from e
+
+    def _run_in_transaction(self, statements: list[str]):
+        with self.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
     def configure_user_cdc(self):
         # ALTER SYSTEM commands require superuser privileges
         with self.engine.connect().execution_options(
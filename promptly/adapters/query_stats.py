@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+import loguru
+
+logger = loguru.logger
+
+
+@dataclass
+class QueryStats:
+    """Execution statistics Trino reports for one query."""
+
+    query_id: str | None
+    query: str
+    state: str | None
+    elapsed_seconds: float
+    cpu_seconds: float
+    queued_seconds: float
+    wall_seconds: float
+    processed_rows: int
+    processed_bytes: int
+    physical_input_bytes: int
+    peak_memory_bytes: int
+    spilled_bytes: int
+    total_splits: int
+    completed_splits: int
+    finished_at: str
+    explain_analyze: str | None = None
+
+    @classmethod
+    def from_cursor(cls, cursor, query: str) -> 'QueryStats':
+        stats = cursor.stats or {}
+        return cls(
+            query_id=cursor.query_id,
+            query=query,
+            state=stats.get('state'),
+            elapsed_seconds=stats.get('elapsedTimeMillis', 0) / 1000,
+            cpu_seconds=stats.get('cpuTimeMillis', 0) / 1000,
+            queued_seconds=stats.get('queuedTimeMillis', 0) / 1000,
+            wall_seconds=stats.get('wallTimeMillis', 0) / 1000,
+            processed_rows=stats.get('processedRows', 0),
+            processed_bytes=stats.get('processedBytes', 0),
+            physical_input_bytes=stats.get('physicalInputBytes', 0),
+            peak_memory_bytes=stats.get('peakMemoryBytes', 0),
+            spilled_bytes=stats.get('spilledBytes', 0),
+            total_splits=stats.get('totalSplits', 0),
+            completed_splits=stats.get('completedSplits', 0),
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    @property
+    def is_read_only(self) -> bool:
+        """Whether re-running the query (for EXPLAIN ANALYZE) is safe."""
+        return is_read_only(self.query)
+
+
+def is_read_only(query: str) -> bool:
+    return (
+        query.lstrip(' \n\t(')
+        .lower()
+        .startswith(('select', 'with', 'values', 'table'))
+    )
+
+
+def log_stats(stats: QueryStats):
+    logger.info(
+        f'Trino query {stats.query_id} {stats.state}: '
+        + f'elapsed {stats.elapsed_seconds:.2f}s, '
+        + f'cpu {stats.cpu_seconds:.2f}s, '
+        + f'queued {stats.queued_seconds:.2f}s, '
+        + f'{stats.processed_rows} rows / '
+        + f'{stats.processed_bytes / 2**20:.1f} MiB processed, '
+        + f'peak memory {stats.peak_memory_bytes / 2**20:.1f} MiB, '
+        + f'{stats.completed_splits}/{stats.total_splits} splits.'
+    )
+    if stats.explain_analyze:
+        logger.info(
+            f'EXPLAIN ANALYZE {stats.query_id}:\n{stats.explain_analyze}'
+        )
+
+
+class JsonlStatsHook:
+    """Appends one JSON line per query to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self, stats: QueryStats):
+        line = json.dumps(asdict(stats)) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+
+class PrometheusStatsHook:
+    """
+    Aggregates query stats and rewrites `path` in the Prometheus text
+    format after every query, for a node exporter textfile collector.
+    """
+
+    PREFIX = 'promptly_trino'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._totals = {
+            'query_elapsed_seconds': 0.0,
+            'query_cpu_seconds': 0.0,
+            'query_queued_seconds': 0.0,
+            'processed_rows': 0,
+            'processed_bytes': 0,
+            'splits': 0,
+        }
+        self._peak_memory_bytes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self, stats: QueryStats):
+        with self._lock:
+            state = stats.state or 'UNKNOWN'
+            self._queries[state] = self._queries.get(state, 0) + 1
+            self._totals['query_elapsed_seconds'] += stats.elapsed_seconds
+            self._totals['query_cpu_seconds'] += stats.cpu_seconds
+            self._totals['query_queued_seconds'] += stats.queued_seconds
+            self._totals['processed_rows'] += stats.processed_rows
+            self._totals['processed_bytes'] += stats.processed_bytes
+            self._totals['splits'] += stats.total_splits
+            self._peak_memory_bytes = max(
+                self._peak_memory_bytes, stats.peak_memory_bytes
+            )
+            self._write()
+
+    def _write(self):
+        lines = [f'# TYPE {self.PREFIX}_queries_total counter']
+        lines.extend(
+            f'{self.PREFIX}_queries_total{{state="{state}"}} {count}'
+            for state, count in sorted(self._queries.items())
+        )
+        for name, value in self._totals.items():
+            lines.extend((
+                f'# TYPE {self.PREFIX}_{name}_total counter',
+                f'{self.PREFIX}_{name}_total {value}',
+            ))
+        lines.extend((
+            f'# TYPE {self.PREFIX}_query_peak_memory_bytes gauge',
+            f'{self.PREFIX}_query_peak_memory_bytes '
+            + f'{self._peak_memory_bytes}',
+        ))
+
+        # Written aside and renamed so scrapes never see a partial file
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+
+import loguru
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = loguru.logger
+
+DEFAULT_RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+_IDENTIFIER = r'(?:"[^"]+"|\w+)'
+_TOKEN = re.compile(r'"[^"]*"|\w+|\S')
+_IDENTIFIER_TOKEN = re.compile(rf'{_IDENTIFIER}$')
+# Clauses that close the relation list opened by FROM
+_FROM_LIST_END = frozenset({
+    'where',
+    'group',
+    'having',
+    'window',
+    'order',
+    'limit',
+    'offset',
+    'fetch',
+    'union',
+    'intersect',
+    'except',
+})
+_SUBQUERY_START = frozenset({'select', 'with', 'values'})
+_CTE_NAME = re.compile(rf'({_IDENTIFIER})\s+as\s*\(', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Canonical form of `query` for cache keys: comments dropped,
+    whitespace collapsed and everything outside string literals
+    lowercased.
+    """
+    query = re.sub(r'--[^\n]*|/\*.*?\*/', ' ', query, flags=re.DOTALL)
+    parts = _STRING_LITERAL.split(query)
+    return ''.join(
+        part if index % 2 else ' '.join(part.split()).lower()
+        for index, part in enumerate(parts)
+    ).strip(' ;')
+
+
+def referenced_tables(query: str) -> list[str] | None:
+    """
+    Fully qualified tables read by `query`, or None when a reference is
+    not `catalog.schema.table` (and so can't be pinned to a snapshot).
+
+    Anything the scan can't be sure about also gives None: comma joins,
+    table functions and parenthesized joins, whose relations are not
+    all preceded by FROM or JOIN.
+    """
+    query = _STRING_LITERAL.sub("''", normalize_sql(query))
+    ctes = {name.strip('"') for name in _CTE_NAME.findall(query)}
+    tokens = _TOKEN.findall(query)
+
+    tables = set()
+    # Whether each open parenthesis level is inside a FROM relation list
+    in_from = [False]
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if token == '(':
+            in_from.append(False)
+        elif token == ')':
+            if len(in_from) > 1:
+                in_from.pop()
+        elif token == ',' and in_from[-1]:
+            return None
+        elif token in _FROM_LIST_END:
+            in_from[-1] = False
+        elif token in {'from', 'join'}:
+            in_from[-1] = True
+            if index < len(tokens) and tokens[index] == '(':
+                if (
+                    index + 1 < len(tokens)
+                    and tokens[index + 1] in _SUBQUERY_START
+                ):
+                    continue
+                return None
+
+            parts, index = _read_name(tokens, index)
+            if parts is None:
+                return None
+            if len(parts) == 1 and parts[0] in ctes:
+                continue
+            if len(parts) != 3:  # noqa: PLR2004
+                return None
+            tables.add('.'.join(parts))
+    return sorted(tables)
+
+
+def _read_name(tokens: list[str], index: int) -> tuple[list[str] | None, int]:
+    """
+    Reads a dotted name starting at `tokens[index]`. Returns None for the
+    parts when there is no name or it is called like a table function.
+    """
+    parts = []
+    while index < len(tokens) and _IDENTIFIER_TOKEN.match(tokens[index]):
+        parts.append(tokens[index].strip('"'))
+        index += 1
+        if index < len(tokens) and tokens[index] == '.':
+            index += 1
+        else:
+            break
+
+    if not parts or (index < len(tokens) and tokens[index] == '('):
+        return None, index
+    return parts, index
+
+
+class ResultCache:
+    """
+    Local Parquet cache of query results with size-based LRU eviction.
+
+    Entries are keyed by the normalized query plus the snapshot ids of
+    the tables it reads, so a new snapshot on any of them is a miss.
+    Recency is tracked through file modification times, which hits
+    refresh.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(query: str, snapshots: dict[str, int]) -> str:
+        payload = json.dumps(
+            {'query': normalize_sql(query), 'snapshots': snapshots},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> pa.Table | None:
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return table
+
+    def put(self, key: str, table: pa.Table):
+        # Written aside and renamed so readers never see a partial file
+        tmp_path = f'{self._path(key)}.{uuid.uuid4().hex}.tmp'
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.parquet'):
+                    os.remove(entry.path)
+
+    def _evict(self):
+        with self._lock:
+            entries = sorted(
+                (
+                    entry.stat().st_mtime,
+                    entry.stat().st_size,
+                    entry.path,
+                )
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith('.parquet')
+            )
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.debug(f'Evicted {path} from the result cache.')
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.parquet')
@@ -1,55 +1,456 @@
 # minio_adapter.py
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator
+
+import certifi
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 
+from promptly.adapters.streams import IteratorIO
+
+# Used for ranged downloads when no part size is configured; uploads let
+# the client pick one from the object size.
+DEFAULT_DOWNLOAD_PART_SIZE = 64 * 1024 * 1024
+# Streams of unknown length need an explicit part size (5 MiB minimum)
+DEFAULT_STREAM_PART_SIZE = 16 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class TransferResult:
+    object_name: str
+    size: int
+    seconds: float
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds else float('inf')
+
+    def __str__(self) -> str:
+        return (
+            f'{self.size / 2**20:.1f} MiB in {self.seconds:.2f}s, '
+            + f'{self.bytes_per_second / 2**20:.1f} MiB/s'
+        )
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    name: str
+    size: int | None
+    etag: str | None
+    last_modified: datetime | None
+    is_dir: bool = False
+
 
 class MinioS3:
-    def __init__(
+    def __init__(  # noqa: PLR0913, PLR0917
         self,
         endpoint_url: str,
         access_key: str,
         secret_key: str,
         secure: bool = True,
+        part_size: int = 0,
+        parallel_parts: int = 3,
+        max_connections: int = 10,
     ):
         self.endpoint_url = endpoint_url
         self.access_key = access_key
         self.secret_key = secret_key
+        self.part_size = part_size
+        self.parallel_parts = parallel_parts
+
+        # Same settings as the client's default pool, sized so parallel
+        # parts and transfers don't queue on HTTP connections
+        timeout = 5 * 60
+        http_client = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            maxsize=max_connections,
+            cert_reqs='CERT_REQUIRED',
+            ca_certs=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+            retries=urllib3.Retry(
+                total=5,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504],
+            ),
+        )
 
         self.client = Minio(
             endpoint_url,
             access_key=access_key,
             secret_key=secret_key,
             secure=secure,
+            http_client=http_client,
         )
 
-    def upload_file(self, bucket_name: str, object_name: str, file_path: str):
+    def upload_file(
+        self,
+        bucket_name: str,
+        object_name: str,
+        file_path: str,
+    ) -> TransferResult | None:
         try:
-            self.client.fput_object(bucket_name, object_name, file_path)
-            print(f'Uploaded {file_path} to {bucket_name}/{object_name}')
+            transfer_time_start = time.time()
+            self.client.fput_object(
+                bucket_name,
+                object_name,
+                file_path,
+                part_size=self.part_size,
+                num_parallel_uploads=self.parallel_parts,
+            )
+            result = TransferResult(
+                object_name,
+                os.path.getsize(file_path),
+                time.time() - transfer_time_start,
+            )
+            print(
+                f'Uploaded {file_path} to {bucket_name}/{object_name} '
+                + f'({result})'
+            )
+            return result
         except S3Error as e:
             print(f'Error uploading file: {e}')
+            return None
 
     def download_file(
         self,
         bucket_name: str,
         object_name: str,
         file_path: str,
-    ):
+    ) -> TransferResult | None:
         try:
-            self.client.fget_object(bucket_name, object_name, file_path)
-            print(f'Downloaded {bucket_name}/{object_name} to {file_path}')
+            transfer_time_start = time.time()
+            stat = self.client.stat_object(bucket_name, object_name)
+            part_size = self.part_size or DEFAULT_DOWNLOAD_PART_SIZE
+
+            if self.parallel_parts > 1 and stat.size > part_size:
+                self._download_parts(
+                    bucket_name, object_name, file_path, stat, part_size
+                )
+            else:
+                self.client.fget_object(bucket_name, object_name, file_path)
+
+            result = TransferResult(
+                object_name, stat.size, time.time() - transfer_time_start
+            )
+            print(
+                f'Downloaded {bucket_name}/{object_name} to {file_path} '
+                + f'({result})'
+            )
+            return result
         except S3Error as e:
             print(f'Error downloading file: {e}')
+            return None
 
-    def list_objects(self, bucket_name: str, prefix: str = ''):
+    def _download_parts(  # noqa: PLR0913, PLR0917
+        self,
+        bucket_name: str,
+        object_name: str,
+        file_path: str,
+        stat,
+        part_size: int,
+    ):
+        """Fetches byte ranges concurrently into a preallocated file."""
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        tmp_path = f'{file_path}.part.minio'
+        with open(tmp_path, 'wb') as tmp_file:
+            tmp_file.truncate(stat.size)
+
+        def fetch(offset: int):
+            response = self.client.get_object(
+                bucket_name,
+                object_name,
+                offset=offset,
+                length=min(part_size, stat.size - offset),
+                # Fail instead of mixing parts of two object versions
+                request_headers={'If-Match': stat.etag},
+            )
+            try:
+                position = offset
+                for chunk in response.stream(1024 * 1024):
+                    os.pwrite(fd, chunk, position)
+                    position += len(chunk)
+            finally:
+                response.close()
+                response.release_conn()
+
+        fd = os.open(tmp_path, os.O_WRONLY)
         try:
-            return [
-                obj.object_name
-                for obj in self.client.list_objects(bucket_name, prefix=prefix)
-            ]  # noqa: E501
+            with ThreadPoolExecutor(max_workers=self.parallel_parts) as pool:
+                list(pool.map(fetch, range(0, stat.size, part_size)))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        finally:
+            os.close(fd)
+
+        os.replace(tmp_path, file_path)
+
+    def upload_many(
+        self,
+        bucket_name: str,
+        source: str | list[str],
+        prefix: str = '',
+        max_workers: int = 8,
+    ) -> list[TransferResult]:
+        """
+        Uploads a directory tree (keeping relative paths) or a list of
+        files (by base name) under `prefix` with `max_workers` threads.
+        """
+        if isinstance(source, str):
+            transfers = [
+                (
+                    prefix
+                    + os.path.relpath(path, source).replace(os.sep, '/'),
+                    path,
+                )
+                for root, _, names in os.walk(source)
+                for path in (os.path.join(root, name) for name in names)
+            ]
+        else:
+            transfers = [
+                (prefix + os.path.basename(path), path) for path in source
+            ]
+
+        return self._run_transfers(
+            'Uploaded',
+            lambda transfer: self.upload_file(bucket_name, *transfer),
+            transfers,
+            max_workers,
+        )
+
+    def download_many(
+        self,
+        bucket_name: str,
+        object_names: list[str],
+        directory: str,
+        max_workers: int = 8,
+    ) -> list[TransferResult]:
+        """Downloads objects into `directory`, keeping their key paths."""
+        return self._run_transfers(
+            'Downloaded',
+            lambda object_name: self.download_file(
+                bucket_name,
+                object_name,
+                os.path.join(directory, *object_name.split('/')),
+            ),
+            object_names,
+            max_workers,
+        )
+
+    @staticmethod
+    def _run_transfers(
+        action: str,
+        transfer,
+        items: list,
+        max_workers: int,
+    ) -> list[TransferResult]:
+        transfer_time_start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = [
+                result
+                for result in executor.map(transfer, items)
+                if result is not None
+            ]
+        seconds = time.time() - transfer_time_start
+
+        total = TransferResult('', sum(r.size for r in results), seconds)
+        print(
+            f'{action} {len(results)}/{len(items)} objects ({total}, '
+            + f'{max_workers} workers)'
+        )
+        return results
+
+    def upload_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        data: bytes | Iterable[bytes] | BinaryIO,
+        length: int | None = None,
+    ) -> TransferResult:
+        """
+        Uploads from a readable file object or an iterable of byte chunks
+        without going through local disk.
+
+        When `length` is unknown the object is sent as a multipart upload,
+        buffering one part per parallel worker. A stream can't be replayed,
+        so errors are raised instead of swallowed.
+        """
+        if isinstance(data, (bytes, bytearray)):
+            data, length = io.BytesIO(data), len(data)
+        elif not hasattr(data, 'read'):
+            # Full reads per part instead of one chunk at a time
+            data = io.BufferedReader(
+                IteratorIO(data), buffer_size=STREAM_CHUNK_SIZE
+            )
+
+        try:
+            transfer_time_start = time.time()
+            self.client.put_object(
+                bucket_name,
+                object_name,
+                data,
+                length if length is not None else -1,
+                part_size=self.part_size or DEFAULT_STREAM_PART_SIZE,
+                num_parallel_uploads=self.parallel_parts,
+            )
+            if length is None:
+                length = self.client.stat_object(bucket_name, object_name).size
+        except S3Error as e:
+            print(f'Error uploading stream: {e}')
+            raise
+
+        result = TransferResult(
+            object_name, length, time.time() - transfer_time_start
+        )
+        print(f'Streamed {bucket_name}/{object_name} ({result})')
+        return result
+
+    def open_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        offset: int = 0,
+        length: int = 0,
+    ) -> Iterator[bytes]:
+        """
+        Yields the object (or `length` bytes from `offset`) in chunks of
+        up to `chunk_size` bytes. Wrap it in `IteratorIO` where a file
+        object is expected.
+        """
+        try:
+            response = self.client.get_object(
+                bucket_name, object_name, offset=offset, length=length
+            )
+        except S3Error as e:
+            print(f'Error opening stream: {e}')
+            raise
+
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def put_bytes(self, bucket_name: str, object_name: str, data: bytes):
+        try:
+            self.client.put_object(
+                bucket_name, object_name, io.BytesIO(data), len(data)
+            )
         except S3Error as e:
+            print(f'Error uploading object: {e}')
+            raise
+
+    def get_bytes(self, bucket_name: str, object_name: str) -> bytes | None:
+        try:
+            response = self.client.get_object(bucket_name, object_name)
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                return None
+            print(f'Error downloading object: {e}')
+            raise
+
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def list_objects(
+        self,
+        bucket_name: str,
+        prefix: str = '',
+        recursive: bool = False,
+        start_after: str | None = None,
+    ) -> Iterator[ObjectInfo]:
+        """
+        Lazily yields the objects under `prefix`, page by page.
+
+        Keys come back in lexical order, so the name of the last object
+        seen can be passed as `start_after` to resume an interrupted
+        listing. Errors are raised, including part way through.
+        """
+        try:
+            for obj in self.client.list_objects(
+                bucket_name,
+                prefix=prefix,
+                recursive=recursive,
+                start_after=start_after,
+            ):
+                yield ObjectInfo(
+                    name=obj.object_name,
+                    size=obj.size,
+                    etag=obj.etag,
+                    last_modified=obj.last_modified,
+                    is_dir=obj.is_dir,
+                )
+        except S3Error as e:
+            # A partial listing must not look like a complete one
             print(f'Error listing objects: {e}')
-            return []
+            raise
+
+    def list_objects_many(  # noqa: PLR0913, PLR0917
+        self,
+        bucket_name: str,
+        prefixes: Iterable[str],
+        recursive: bool = True,
+        max_workers: int = 8,
+        buffer_size: int = 1000,
+    ) -> Iterator[ObjectInfo]:
+        """
+        Lists several prefixes (e.g. one per tenant) concurrently and
+        yields their objects prefix by prefix, in the order given.
+
+        Each listing runs ahead by at most `buffer_size` objects, so memory
+        stays bounded however many objects there are. Closing the generator
+        early stops the listings still running.
+        """
+        prefixes = list(prefixes)
+        listings = [queue.Queue(maxsize=buffer_size) for _ in prefixes]
+        stop = threading.Event()
+        done = object()
+
+        def put(listing: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    listing.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(prefix: str, listing: queue.Queue):
+            try:
+                for info in self.list_objects(bucket_name, prefix, recursive):
+                    if not put(listing, info):
+                        return
+            except Exception as e:
+                put(listing, e)
+                return
+            put(listing, done)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Listings start in order and the consumer drains them in
+            # order, so a later prefix always gets a free worker
+            for prefix, listing in zip(prefixes, listings):
+                executor.submit(produce, prefix, listing)
+            for listing in listings:
+                while (item := listing.get()) is not done:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def create_bucket_if_not_exists(self, bucket_name: str):
         try:
@@ -0,0 +1,31 @@
+import io
+from typing import Iterable
+
+
+class IteratorIO(io.RawIOBase):
+    """
+    Read-only file object over an iterable of byte chunks.
+
+    Lets producers that generate data lazily be handed to APIs that expect
+    a file (`COPY ... FROM STDIN`, object uploads) without materializing the
+    whole payload first. Only the chunk currently being read is held.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b'')
+
+    def readable(self) -> bool:  # noqa: PLR6301
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
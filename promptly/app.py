@@ -1,67 +1,121 @@
 import os
-import subprocess
 
 import loguru
 from dotenv import load_dotenv
 
+from promptly.adapters.dbt import DbtProject
+from promptly.extractors.landing import convert_pending_drops
+from promptly.extractors.parquet import extract_incremental_tables
+from promptly.orchestration.scheduler import Step, StepScheduler
+from promptly.settings import configure_settings
+
 logger = loguru.logger
 
 
 def main():
     load_dotenv()
+    settings = configure_settings()
 
-    env_vars = [
-        'TRINO_HOST',
-        'TRINO_PORT',
-        'TRINO_USER',
-        'TRINO_PASSWORD',
-        'TRINO_CATALOG',
-        'TRINO_SCHEMA',
-        'TRINO_DBT_THREADS',
-    ]
-
-    pre_command = ''.join([f'{var}={os.getenv(var)} ' for var in env_vars])
+    # dbt runs in this process, reading the TRINO_* variables loaded above,
+    # and compares each run with the artifacts of the tenant's last one
+    dbt = DbtProject(state_dir=f'.promptly/dbt-state/{settings.tenant}')
+    # dbtRunner isn't thread-safe, so dbt steps hold the single 'dbt' slot
+    uses_dbt = {'dbt': 1}
 
-    dbt_common_configs = (
-        ' --project-dir dbt/promptly/ --profiles-dir dbt/promptly/profiles/'  # noqa: E501
-    )
+    def elementary_setup():
+        # Rebuilding Elementary's tables is only needed when they change
+        if dbt.has_state and not dbt.changed('package:elementary'):
+            logger.info('Elementary models unchanged, skipping setup.')
+            return
+        dbt.run(
+            '--select',
+            'elementary',
+            '--full-refresh',
+            description='Elementary Setup',
+        )
 
-    dbt_commands = [
-        (
-            'poetry run dbt deps' + dbt_common_configs + ' --target trino',
+    steps = [
+        Step(
+            'Stage Landing Files',
+            lambda: convert_pending_drops(settings),
+            retries=2,
+        ),
+        Step(
+            'Extract Postgres',
+            lambda: extract_incremental_tables(settings),
+            retries=2,
+        ),
+        Step(
             'DBT Deps',
+            # The tenant runner installs packages once for all tenants
+            dbt.deps
+            if os.getenv('PROMPTLY_DBT_DEPS', 'true').lower() == 'true'
+            else lambda: None,
+            resources=uses_dbt,
+            retries=2,
         ),
-        (
-            'poetry run dbt run --select elementary --full-refresh'
-            + dbt_common_configs
-            + ' --target trino',
+        Step(
             'Elementary Setup',
-        ),  # noqa: E501
+            elementary_setup,
+            depends_on=['DBT Deps'],
+            resources=uses_dbt,
+        ),
+        Step(
+            'Source Freshness',
+            dbt.source_freshness,
+            depends_on=['DBT Deps', 'Stage Landing Files', 'Extract Postgres'],
+            resources=uses_dbt,
+        ),
         # TODO: move these to airflow
-        (
-            'poetry run dbt run --exclude elementary '
-            + dbt_common_configs
-            + ' --target trino',  # noqa: E501
+        Step(
             'DBT Run',
+            # Only models changed since the last run, or fed by fresher
+            # sources, plus their children; everything without saved state
+            lambda: dbt.run(*dbt.state_selection(), '--exclude', 'elementary'),
+            depends_on=['Elementary Setup', 'Source Freshness'],
+            resources=uses_dbt,
+            retries=1,
         ),
-        (
-            'poetry run dbt test ' + dbt_common_configs + ' --target trino',
+        Step(
             'DBT Test',
+            lambda: dbt.test(*dbt.state_selection()),
+            depends_on=['DBT Run'],
+            resources=uses_dbt,
         ),
-        (
-            'poetry run edr monitor'
-            + dbt_common_configs
-            + f' --slack-token {os.getenv("ELEMENTARY_SLACK_TOKEN")}'
-            + f' --slack-channel-name {os.getenv("ELEMENTARY_SLACK_CHANNEL")}',
+        Step(
+            'Save dbt State',
+            dbt.save_state,
+            depends_on=['DBT Test'],
+            resources=uses_dbt,
+        ),
+        Step(
             'Elementary Monitor',
+            lambda: dbt.edr(
+                [
+                    'monitor',
+                    '--slack-token',
+                    str(os.getenv('ELEMENTARY_SLACK_TOKEN')),
+                    '--slack-channel-name',
+                    str(os.getenv('ELEMENTARY_SLACK_CHANNEL')),
+                ],
+                'Elementary Monitor',
+            ),
+            depends_on=['DBT Test'],
+            retries=2,
+        ),
+        Step(
+            'Elementary Report',
+            lambda: dbt.edr(['report'], 'Elementary Report'),
+            depends_on=['DBT Test'],
+            retries=2,
         ),
-        ('poetry run edr report' + dbt_common_configs, 'Elementary Report'),
     ]
 
-    for command, description in dbt_commands:
-        logger.info(f'Running: {description}')
-        logger.debug(f'Full command: {pre_command + command}')
-        subprocess.run(pre_command + command, shell=True, check=True)
+    try:
+        StepScheduler(steps, max_workers=4, resource_limits=uses_dbt).run()
+    finally:
+        # Per-invocation dbt timings, next to the scheduler's step summary
+        dbt.log_timings()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,173 @@
+import os
+import posixpath
+import tempfile
+import time
+from typing import Iterator
+
+import loguru
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from promptly.adapters.s3 import MinioS3, ObjectInfo
+from promptly.adapters.streams import IteratorIO
+from promptly.extractors.parquet import DEFAULT_ROW_GROUP_SIZE, regroup_batches
+from promptly.settings import Settings, configure_settings
+from promptly.state.manifest import ObjectManifest
+
+logger = loguru.logger
+
+# Client CSV header -> (Parquet column, type). Identifiers keep their
+# leading zeros, so they stay strings.
+PROVIDER_CSV_COLUMNS = {
+    'ProviderName': ('provider_name', pa.string()),
+    'ProviderID': ('provider_id', pa.string()),
+    'NPI': ('npi', pa.string()),
+    'Specialty': ('specialty', pa.string()),
+    'SiteName': ('site_name', pa.string()),
+    'SourceID': ('source_id', pa.string()),
+    'SpecSource': ('spec_source', pa.string()),
+    'IDSource': ('id_source', pa.string()),
+}
+PROVIDER_SORT_KEYS = ['npi', 'provider_id']
+# Literals clients use for missing values
+NULL_VALUES = ['', 'NULL', 'null', 'N/A']
+CSV_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class LandingCsvConverter:
+    """
+    Converts client CSV drops in the landing prefix into Parquet.
+
+    Each new or changed CSV (per the object manifest) is streamed from
+    MinIO through the Arrow CSV reader with a fixed schema and written as
+    one compressed Parquet object in the raw zone, a row group at a time.
+    Rows are sorted by `sort_keys` within each row group, so its
+    statistics prune well while only one row group is held in memory;
+    the Parquet file is staged on local disk until it is uploaded.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        s3: MinioS3,
+        manifest: ObjectManifest,
+        bucket: str = 'healthcare',
+        landing_prefix: str = 'raw/',
+        raw_zone_prefix: str = 'parquet/providers',
+        columns: dict = PROVIDER_CSV_COLUMNS,
+        sort_keys: list[str] = PROVIDER_SORT_KEYS,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = 'zstd',
+    ):
+        self.s3 = s3
+        self.manifest = manifest
+        self.bucket = bucket
+        self.landing_prefix = landing_prefix
+        self.raw_zone_prefix = raw_zone_prefix
+        self.columns = columns
+        self.sort_keys = sort_keys
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schema = pa.schema(list(columns.values()))
+
+    def convert_pending(self) -> list[str]:
+        """Converts the drops not processed yet and records them."""
+        pending = [
+            obj
+            for obj in self.manifest.pending(
+                self.s3, self.bucket, self.landing_prefix
+            )
+            if obj.name.lower().endswith('.csv')
+        ]
+
+        object_names = []
+        for obj in pending:
+            object_names.append(self.convert(obj))
+            self.manifest.mark_processed(self.bucket, [obj])
+
+        return object_names
+
+    def convert(self, obj: ObjectInfo) -> str:
+        conversion_time_start = time.time()
+        object_name = self.raw_zone_name(obj.name)
+        num_rows = 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'drop.parquet')
+            with pq.ParquetWriter(
+                file_path, self.schema, compression=self.compression
+            ) as writer:
+                for table in regroup_batches(
+                    self.iter_csv_batches(obj.name),
+                    self.schema,
+                    self.row_group_size,
+                ):
+                    row_group = (
+                        table.sort_by([
+                            (key, 'ascending') for key in self.sort_keys
+                        ])
+                        if self.sort_keys
+                        else table
+                    )
+                    writer.write_table(
+                        row_group, row_group_size=self.row_group_size
+                    )
+                    num_rows += row_group.num_rows
+
+            result = self.s3.upload_file(self.bucket, object_name, file_path)
+            if result is None:
+                raise RuntimeError(
+                    f'Failed to upload {self.bucket}/{object_name}.'
+                )
+
+        logger.info(
+            f'Converted {obj.name} ({num_rows} rows) into '
+            + f'{object_name} in: '
+            + f'{time.time() - conversion_time_start} seconds.'
+        )
+        return object_name
+
+    def iter_csv_batches(self, object_name: str) -> Iterator[pa.RecordBatch]:
+        """Yields the CSV's blocks as record batches of `self.schema`."""
+        reader = pa_csv.open_csv(
+            IteratorIO(self.s3.open_stream(self.bucket, object_name)),
+            read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={
+                    header: data_type
+                    for header, (_, data_type) in self.columns.items()
+                },
+                include_columns=list(self.columns),
+                null_values=NULL_VALUES,
+                strings_can_be_null=True,
+            ),
+        )
+        for batch in reader:
+            yield batch.rename_columns([
+                self.columns[header][0] for header in batch.schema.names
+            ]).cast(self.schema)
+
+    def raw_zone_name(self, object_name: str) -> str:
+        # Flattened, since the Hive connector doesn't read subdirectories
+        relative = posixpath.relpath(object_name, self.landing_prefix)
+        stem = posixpath.splitext(relative)[0].replace('/', '__')
+        return f'{self.raw_zone_prefix}/{stem}.parquet'
+
+
+def convert_pending_drops(settings: Settings) -> list[str]:
+    converter = LandingCsvConverter(
+        s3=settings.s3,
+        manifest=settings.manifest,
+        bucket=settings.bucket,
+        landing_prefix=f'{settings.bucket_prefix}raw/',
+        raw_zone_prefix=f'{settings.bucket_prefix}parquet/providers',
+    )
+    return converter.convert_pending()
+
+
+def main():
+    convert_pending_drops(configure_settings())
+
+
+if __name__ == '__main__':
+    main()
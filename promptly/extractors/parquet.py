@@ -0,0 +1,236 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+import loguru
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from promptly.adapters.postgres import HealthCareDB
+from promptly.adapters.s3 import MinioS3
+from promptly.settings import Settings, configure_settings
+from promptly.state.watermarks import WatermarkStore
+
+logger = loguru.logger
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+DEFAULT_ROWS_PER_FILE = 2_000_000
+
+
+class PostgresParquetExtractor:
+    """
+    Bulk copies Postgres tables into Parquet files on MinIO.
+
+    Rows are read with COPY TO STDOUT as Arrow batches, regrouped into
+    `row_group_size` row groups and rolled over into a new object every
+    `rows_per_file` rows. Trino is not involved at any point.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        db: HealthCareDB,
+        s3: MinioS3,
+        bucket: str = 'healthcare',
+        prefix: str = 'extract/postgres',
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+        compression: str = 'zstd',
+    ):
+        self.db = db
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+
+    def extract_table(
+        self,
+        table: str,
+        where: str | None = None,
+        object_prefix: str | None = None,
+        snapshot: str | None = None,
+    ) -> list[str]:
+        """
+        Extracts `table` (optionally filtered by `where`) and returns the
+        names of the Parquet objects written.
+        """
+        schema = self.db.arrow_schema(table)
+        query = f'SELECT {", ".join(schema.names)} FROM {table}'
+        if where:
+            query += f' WHERE {where}'
+
+        object_prefix = object_prefix or f'{self.prefix}/{table}'
+        extraction_time_start = time.time()
+
+        batches = self.db.iter_copy_batches(query, schema, snapshot=snapshot)
+        object_names = self.write_parquet(batches, schema, object_prefix)
+
+        logger.info(
+            f'Extracted {table} into {len(object_names)} Parquet files '
+            + f'in: {time.time() - extraction_time_start} seconds.'
+        )
+        return object_names
+
+    def extract_incremental(  # noqa: PLR0913, PLR0917
+        self,
+        table: str,
+        column: str,
+        watermarks: WatermarkStore,
+        tenant: str = 'default',
+        source: str = 'postgres',
+    ) -> list[str]:
+        """
+        Extracts only the rows of `table` whose `column` is above the
+        stored high-water mark, then advances the mark.
+
+        The upper bound is fixed before extracting, so rows that arrive
+        while the extraction runs are left for the next run instead of
+        being read twice.
+        """
+        previous = watermarks.get(source, table, tenant)
+        lower_bound = (
+            f'{column} > {_sql_literal(previous)}'
+            if previous is not None
+            else 'TRUE'
+        )
+
+        [(current,)] = self.db.execute_query(
+            f'SELECT MAX({column}) FROM {table} WHERE {lower_bound}'
+        )
+        if current is None:
+            logger.info(
+                f'No rows in {table} ({tenant}) past watermark {previous}.'
+            )
+            return []
+
+        upper_bound = f'{column} <= {_sql_literal(current)}'
+        run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        object_names = self.extract_table(
+            table,
+            where=f'{lower_bound} AND {upper_bound}',
+            object_prefix=f'{self.prefix}/{tenant}/{table}/{run_id}',
+        )
+
+        watermarks.set(source, table, current, tenant)
+        return object_names
+
+    def write_parquet(
+        self,
+        batches: Iterable[pa.RecordBatch],
+        schema: pa.Schema,
+        object_prefix: str,
+    ) -> list[str]:
+        """
+        Writes `batches` as Parquet objects under `object_prefix`.
+
+        A file is closed and uploaded after the row group that brings it
+        to `rows_per_file` rows, so only one file is on local disk at once.
+        """
+        object_names = []
+        writer = None
+        file_rows = 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'part.parquet')
+
+            def upload():
+                object_name = (
+                    f'{object_prefix}/part-{len(object_names):05d}.parquet'
+                )
+                result = self.s3.upload_file(
+                    bucket_name=self.bucket,
+                    object_name=object_name,
+                    file_path=file_path,
+                )
+                # upload_file swallows S3 errors; a missing part must not
+                # count as extracted or advance any watermark
+                if result is None:
+                    raise RuntimeError(
+                        f'Failed to upload {self.bucket}/{object_name}.'
+                    )
+                object_names.append(object_name)
+
+            for row_group in regroup_batches(
+                batches, schema, self.row_group_size
+            ):
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        file_path, schema, compression=self.compression
+                    )
+                writer.write_table(
+                    row_group, row_group_size=self.row_group_size
+                )
+                file_rows += row_group.num_rows
+
+                if file_rows >= self.rows_per_file:
+                    writer.close()
+                    upload()
+                    writer = None
+                    file_rows = 0
+
+            if writer is not None:
+                writer.close()
+                upload()
+
+        return object_names
+
+
+def _sql_literal(value) -> str:
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
+
+
+def regroup_batches(
+    batches: Iterable[pa.RecordBatch],
+    schema: pa.Schema,
+    rows: int,
+) -> Iterator[pa.Table]:
+    """Re-slices arbitrarily sized batches into tables of `rows` rows."""
+    pending = []
+    pending_rows = 0
+
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows < rows:
+            continue
+
+        table = pa.Table.from_batches(pending, schema=schema)
+        offset = 0
+        while table.num_rows - offset >= rows:
+            yield table.slice(offset, rows)
+            offset += rows
+        pending = table.slice(offset).to_batches()
+        pending_rows = table.num_rows - offset
+
+    if pending_rows:
+        yield pa.Table.from_batches(pending, schema=schema)
+
+
+def extract_incremental_tables(settings: Settings):
+    extractor = PostgresParquetExtractor(
+        db=settings.health_care_db,
+        s3=settings.s3,
+        bucket=settings.bucket,
+        prefix=f'{settings.bucket_prefix}extract/postgres',
+    )
+
+    settings.s3.create_bucket_if_not_exists(extractor.bucket)
+    for table, key in [
+        ('provider', 'provider_id'),
+        ('care_site', 'care_site_id'),
+    ]:
+        extractor.extract_incremental(
+            table, key, settings.watermarks, tenant=settings.tenant
+        )
+
+
+def main():
+    extract_incremental_tables(configure_settings())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import loguru
+
+from promptly.adapters.postgres import HealthCareDB
+from promptly.adapters.s3 import MinioS3
+from promptly.extractors.parquet import (
+    DEFAULT_ROW_GROUP_SIZE,
+    PostgresParquetExtractor,
+)
+from promptly.settings import Settings, configure_settings
+
+logger = loguru.logger
+
+MANIFEST_NAME = '_manifest.json'
+
+
+class SnapshotExtractor:
+    """
+    Extracts full table snapshots split into primary key ranges.
+
+    The integer key space between min and max of `key` is cut into
+    `partitions` contiguous ranges that are extracted concurrently, one
+    Parquet object per range. Progress is kept in a manifest next to the
+    data, so a run that failed part way can be resumed with the same
+    `snapshot_id` and only redoes the ranges that are not done yet.
+
+    Key bounds and ranges of one run are read from the same exported
+    Postgres snapshot. A resumed run exports a new one, so the snapshot is
+    then no longer point-in-time consistent: each range records the
+    `snapshot_at` time it was read as of.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        db: HealthCareDB,
+        s3: MinioS3,
+        bucket: str = 'healthcare',
+        prefix: str = 'snapshots/postgres',
+        workers: int = 4,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    ):
+        self.db = db
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.workers = workers
+        self.extractor = PostgresParquetExtractor(
+            db=db,
+            s3=s3,
+            bucket=bucket,
+            prefix=prefix,
+            row_group_size=row_group_size,
+            # One object per range
+            rows_per_file=sys.maxsize,
+        )
+        self._manifest_lock = threading.Lock()
+
+    def snapshot_table(
+        self,
+        table: str,
+        key: str,
+        partitions: int = 8,
+        snapshot_id: str | None = None,
+    ) -> dict:
+        """
+        Extracts `table` and returns its manifest.
+
+        Passing the `snapshot_id` of an earlier, partially failed run
+        retries only its pending and failed ranges.
+        """
+        snapshot_time_start = time.time()
+        # Bounds and all ranges of this run read from the same MVCC snapshot
+        with self.db.exported_snapshot() as pg_snapshot:
+            snapshot_at = datetime.now(timezone.utc).isoformat()
+            manifest = None
+            if snapshot_id:
+                manifest = self.load_manifest(table, snapshot_id)
+            if manifest is None:
+                manifest = self._new_manifest(
+                    table, key, partitions, snapshot_id, pg_snapshot
+                )
+
+            pending = [
+                key_range
+                for key_range in manifest['ranges']
+                if key_range['status'] != 'done'
+            ]
+            logger.info(
+                f'Snapshot {manifest["snapshot_id"]} of {table}: extracting '
+                + f'{len(pending)} of {len(manifest["ranges"])} ranges.'
+            )
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._extract_range,
+                        manifest,
+                        key_range,
+                        pg_snapshot,
+                        snapshot_at,
+                    )
+                    for key_range in pending
+                ]
+            # Extraction errors are recorded per range; anything raised
+            # here failed to reach the manifest, e.g. an S3 error saving it
+            for future in futures:
+                future.result()
+
+        failed = [r for r in manifest['ranges'] if r['status'] != 'done']
+        logger.info(
+            f'Snapshot {manifest["snapshot_id"]} of {table} finished in: '
+            + f'{time.time() - snapshot_time_start} seconds, '
+            + f'{len(failed)} ranges failed.'
+        )
+        if failed:
+            raise RuntimeError(
+                f'{len(failed)} ranges of snapshot {manifest["snapshot_id"]} '
+                + f'of {table} failed; rerun with this snapshot_id to retry.'
+            )
+
+        return manifest
+
+    def load_manifest(self, table: str, snapshot_id: str) -> dict | None:
+        data = self.s3.get_bytes(
+            self.bucket, self._manifest_name(table, snapshot_id)
+        )
+        return json.loads(data) if data is not None else None
+
+    def _new_manifest(
+        self,
+        table: str,
+        key: str,
+        partitions: int,
+        snapshot_id: str | None,
+        pg_snapshot: str,
+    ) -> dict:
+        [(lower, upper)] = self.db.execute_query(
+            f'SELECT MIN({key}), MAX({key}) FROM {table}',
+            snapshot=pg_snapshot,
+        )
+        if lower is None:
+            bounds = []
+        else:
+            # Half-open [lower, upper) ranges covering min..max inclusive
+            upper += 1
+            step = max(-(-(upper - lower) // partitions), 1)
+            bounds = [
+                (start, min(start + step, upper))
+                for start in range(lower, upper, step)
+            ]
+
+        manifest = {
+            'table': table,
+            'key': key,
+            'snapshot_id': snapshot_id
+            or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'ranges': [
+                {
+                    'index': index,
+                    'lower': start,
+                    'upper': end,
+                    'status': 'pending',
+                    'objects': [],
+                    'error': None,
+                    'snapshot_at': None,
+                }
+                for index, (start, end) in enumerate(bounds)
+            ],
+        }
+        self._save_manifest(manifest)
+        return manifest
+
+    def _extract_range(
+        self,
+        manifest: dict,
+        key_range: dict,
+        pg_snapshot: str,
+        snapshot_at: str,
+    ):
+        table, key = manifest['table'], manifest['key']
+        try:
+            objects = self.extractor.extract_table(
+                table,
+                where=(
+                    f'{key} >= {key_range["lower"]} '
+                    + f'AND {key} < {key_range["upper"]}'
+                ),
+                object_prefix=(
+                    f'{self._snapshot_prefix(table, manifest["snapshot_id"])}'
+                    + f'/range-{key_range["index"]:05d}'
+                ),
+                snapshot=pg_snapshot,
+            )
+            changes = {
+                'status': 'done',
+                'objects': objects,
+                'error': None,
+                'snapshot_at': snapshot_at,
+            }
+        except Exception as e:
+            logger.error(f'Range {key_range["index"]} of {table} failed: {e}')
+            changes = {'status': 'failed', 'error': str(e)}
+
+        self._save_manifest(manifest, key_range, changes)
+
+    def _save_manifest(
+        self,
+        manifest: dict,
+        key_range: dict | None = None,
+        changes: dict | None = None,
+    ):
+        with self._manifest_lock:
+            if key_range is not None:
+                key_range.update(changes)
+            self.s3.put_bytes(
+                self.bucket,
+                self._manifest_name(
+                    manifest['table'], manifest['snapshot_id']
+                ),
+                json.dumps(manifest, indent=2).encode('utf-8'),
+            )
+
+    def _snapshot_prefix(self, table: str, snapshot_id: str) -> str:
+        return f'{self.prefix}/{table}/{snapshot_id}'
+
+    def _manifest_name(self, table: str, snapshot_id: str) -> str:
+        return f'{self._snapshot_prefix(table, snapshot_id)}/{MANIFEST_NAME}'
+
+
+def main():
+    settings: Settings = configure_settings()
+    extractor = SnapshotExtractor(
+        db=settings.health_care_db,
+        s3=settings.s3,
+        bucket=settings.bucket,
+        prefix=f'{settings.bucket_prefix}snapshots/postgres',
+    )
+
+    settings.s3.create_bucket_if_not_exists(extractor.bucket)
+    extractor.snapshot_table('provider', key='provider_id')
+    extractor.snapshot_table('care_site', key='care_site_id', partitions=1)
+
+
+if __name__ == '__main__':
+    main()
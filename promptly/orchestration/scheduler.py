@@ -0,0 +1,185 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+import loguru
+
+logger = loguru.logger
+
+
+@dataclass
+class Step:
+    name: str
+    run: Callable[[], object]
+    depends_on: list[str] = field(default_factory=list)
+    # Units of named resources held while running, e.g. {'dbt': 1}
+    resources: dict[str, int] = field(default_factory=dict)
+    retries: int = 0
+    backoff_seconds: float = 5.0
+
+
+@dataclass
+class StepOutcome:
+    name: str
+    status: str = 'pending'
+    attempts: int = 0
+    started_at: float | None = None
+    seconds: float = 0.0
+    error: Exception | None = None
+
+
+class StepScheduler:
+    """
+    Runs steps as a dependency graph on a worker pool.
+
+    A step starts once all of its dependencies succeeded and enough units
+    of each resource it declares are free, so independent steps overlap
+    while, say, everything that calls dbt stays serialized. Failed steps
+    are retried with exponential backoff; when they still fail, every
+    step depending on them is skipped and the rest of the graph goes on.
+    """
+
+    def __init__(
+        self,
+        steps: list[Step],
+        max_workers: int = 4,
+        resource_limits: dict[str, int] | None = None,
+    ):
+        self.steps = {step.name: step for step in steps}
+        self.max_workers = max_workers
+        self.resource_limits = resource_limits or {}
+        self._validate()
+
+    def _validate(self):
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(
+                        f'Step {step.name} depends on unknown {dependency}.'
+                    )
+            for resource, units in step.resources.items():
+                if units > self.resource_limits.get(resource, units):
+                    limit = self.resource_limits[resource]
+                    raise ValueError(
+                        f'Step {step.name} needs {units} {resource}, more '
+                        + f'than the limit of {limit}.'
+                    )
+
+        # Kahn's algorithm: anything left unordered is part of a cycle
+        remaining = {
+            name: set(step.depends_on) for name, step in self.steps.items()
+        }
+        while True:
+            ready = {name for name, deps in remaining.items() if not deps}
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f'Dependency cycle among {sorted(remaining)}.')
+
+    def run(self) -> dict[str, StepOutcome]:
+        outcomes = {name: StepOutcome(name) for name in self.steps}
+        in_use = dict.fromkeys(self.resource_limits, 0)
+        running = {}
+        run_time_start = time.time()
+
+        def fits(step: Step) -> bool:
+            return all(
+                in_use.get(resource, 0) + units
+                <= self.resource_limits.get(resource, units)
+                for resource, units in step.resources.items()
+            )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                skipped = False
+                for name, step in self.steps.items():
+                    outcome = outcomes[name]
+                    if outcome.status != 'pending':
+                        continue
+
+                    statuses = {
+                        outcomes[dep].status for dep in step.depends_on
+                    }
+                    if statuses & {'failed', 'skipped'}:
+                        outcome.status = 'skipped'
+                        skipped = True
+                        logger.warning(
+                            f'Skipping {name}: a dependency failed.'
+                        )
+                    elif (
+                        statuses <= {'done'}
+                        and len(running) < self.max_workers
+                        and fits(step)
+                    ):
+                        for resource, units in step.resources.items():
+                            in_use[resource] = in_use.get(resource, 0) + units
+                        outcome.status = 'running'
+                        outcome.started_at = time.time() - run_time_start
+                        running[
+                            executor.submit(self._run_step, step, outcome)
+                        ] = step
+
+                if not running:
+                    if skipped:
+                        # Skips may cascade to steps already looked at
+                        continue
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    for resource, units in step.resources.items():
+                        in_use[resource] -= units
+
+        self.log_summary(outcomes, time.time() - run_time_start)
+
+        failed = [o.name for o in outcomes.values() if o.status == 'failed']
+        if failed:
+            raise RuntimeError(f'Steps failed: {", ".join(failed)}.')
+        return outcomes
+
+    @staticmethod
+    def _run_step(step: Step, outcome: StepOutcome):
+        step_time_start = time.time()
+        for attempt in range(step.retries + 1):
+            outcome.attempts = attempt + 1
+            try:
+                logger.info(f'Running: {step.name} (attempt {attempt + 1})')
+                step.run()
+                outcome.status = 'done'
+                break
+            except Exception as e:
+                outcome.error = e
+                if attempt == step.retries:
+                    outcome.status = 'failed'
+                    logger.error(f'{step.name} failed: {e}')
+                    break
+                backoff = step.backoff_seconds * 2**attempt
+                logger.warning(
+                    f'{step.name} failed: {e}; retrying in {backoff:.0f}s.'
+                )
+                time.sleep(backoff)
+        outcome.seconds = time.time() - step_time_start
+
+    @staticmethod
+    def log_summary(outcomes: dict[str, StepOutcome], total_seconds: float):
+        for outcome in sorted(
+            outcomes.values(),
+            key=lambda o: (o.started_at is None, o.started_at or 0),
+        ):
+            started = (
+                f'+{outcome.started_at:.1f}s'
+                if outcome.started_at is not None
+                else '-'
+            )
+            logger.info(
+                f'{outcome.name}: {outcome.status}, started {started}, '
+                + f'took {outcome.seconds:.2f}s, '
+                + f'{outcome.attempts} attempt(s)'
+            )
+        logger.info(f'Pipeline finished in: {total_seconds:.2f} seconds.')
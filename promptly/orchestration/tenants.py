@@ -0,0 +1,187 @@
+"""
+Runs the pipeline (`promptly/app.py`) once per tenant of the registry.
+
+Usage: poetry run python promptly/orchestration/tenants.py \
+    --registry tenants.yaml --max-concurrency 8 --per-engine-limit 2
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+
+import loguru
+import yaml
+from dotenv import load_dotenv
+
+from promptly.adapters.dbt import DbtProject
+from promptly.orchestration.scheduler import Step, StepScheduler
+
+logger = loguru.logger
+
+DEFAULT_REGISTRY_PATH = 'tenants.yaml'
+DEFAULT_LOG_DIR = '.promptly/logs/tenants'
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app.py')
+
+
+@dataclass
+class Tenant:
+    name: str
+    trino_schema: str
+    bucket: str = 'healthcare'
+    bucket_prefix: str = ''
+    # Trino cluster (or other shared engine) the tenant's queries hit
+    engine: str = 'default'
+    enabled: bool = True
+    # Any other variable configure_settings reads, e.g. the client's
+    # Postgres host or a different TRINO_HOST for its engine
+    env: dict[str, str] = field(default_factory=dict)
+
+    def environment(self) -> dict[str, str]:
+        return {
+            'PROMPTLY_TENANT': self.name,
+            'PROMPTLY_BUCKET': self.bucket,
+            'PROMPTLY_BUCKET_PREFIX': self.bucket_prefix,
+            'TRINO_SCHEMA': self.trino_schema,
+            # Separate dbt artifacts so concurrent tenants don't clash
+            'DBT_TARGET_PATH': f'target/tenants/{self.name}',
+            'DBT_LOG_PATH': f'logs/tenants/{self.name}',
+            **{key: str(value) for key, value in self.env.items()},
+        }
+
+
+def load_tenants(path: str = DEFAULT_REGISTRY_PATH) -> list[Tenant]:
+    """
+    Reads the registry: a `tenants` list, each entry merged over the
+    optional `defaults` mapping.
+    """
+    with open(path, encoding='utf-8') as file:
+        registry = yaml.safe_load(file) or {}
+
+    defaults = registry.get('defaults', {})
+    tenants = []
+    for entry in registry.get('tenants', []):
+        tenant = Tenant(**{
+            **defaults,
+            **entry,
+            # YAML reads names like `off` or `2024` as other types
+            'name': str(entry['name']),
+            'env': {**defaults.get('env', {}), **entry.get('env', {})},
+        })
+        tenants.append(tenant)
+
+    names = [tenant.name for tenant in tenants]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f'Duplicate tenants in {path}: {sorted(duplicates)}')
+
+    # Tenants sharing either would overwrite each other's tables: the
+    # prefix also places their Iceberg files (see the iceberg_location dbt
+    # macro), the schema holds their raw, curated and elementary tables
+    for attribute, description in [
+        ('bucket_prefix', 'a bucket prefix'),
+        ('trino_schema', 'a Trino schema'),
+    ]:
+        values = [getattr(tenant, attribute) for tenant in tenants]
+        shared = {
+            tenant.name
+            for tenant, value in zip(tenants, values)
+            if values.count(value) > 1
+        }
+        if shared:
+            raise ValueError(
+                f'Tenants in {path} share {description}: {sorted(shared)}'
+            )
+    return tenants
+
+
+class TenantRunner:
+    """
+    Runs the pipeline for many tenants, each in its own process.
+
+    Processes keep tenants isolated: their own environment, dbt state and
+    failures. At most `max_concurrency` tenants run at once, and at most
+    `per_engine_limit` of them against the same engine; a failing tenant
+    is logged and the others carry on.
+    """
+
+    def __init__(
+        self,
+        tenants: list[Tenant],
+        max_concurrency: int = 8,
+        per_engine_limit: int = 2,
+        log_dir: str = DEFAULT_LOG_DIR,
+    ):
+        self.tenants = [tenant for tenant in tenants if tenant.enabled]
+        self.max_concurrency = max_concurrency
+        self.per_engine_limit = per_engine_limit
+        self.log_dir = log_dir
+
+    def run(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        # Packages are shared by every tenant: install them once, up front
+        DbtProject().deps()
+
+        engines = {f'engine:{tenant.engine}' for tenant in self.tenants}
+        steps = [
+            Step(
+                tenant.name,
+                lambda tenant=tenant: self.run_tenant(tenant),
+                resources={f'engine:{tenant.engine}': 1},
+            )
+            for tenant in self.tenants
+        ]
+        return StepScheduler(
+            steps,
+            max_workers=self.max_concurrency,
+            resource_limits=dict.fromkeys(engines, self.per_engine_limit),
+        ).run()
+
+    def run_tenant(self, tenant: Tenant):
+        log_path = os.path.join(self.log_dir, f'{tenant.name}.log')
+        logger.info(f'Tenant {tenant.name} started, logging to {log_path}.')
+
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            subprocess.run(
+                [sys.executable, APP_PATH],
+                env={
+                    **os.environ,
+                    **tenant.environment(),
+                    'PROMPTLY_DBT_DEPS': 'false',
+                },
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                check=True,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH)
+    parser.add_argument('--max-concurrency', type=int, default=8)
+    parser.add_argument('--per-engine-limit', type=int, default=2)
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR)
+    parser.add_argument(
+        '--tenant',
+        action='append',
+        help='Only run these tenants (repeatable).',
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    tenants = load_tenants(args.registry)
+    if args.tenant:
+        tenants = [tenant for tenant in tenants if tenant.name in args.tenant]
+
+    TenantRunner(
+        tenants,
+        max_concurrency=args.max_concurrency,
+        per_engine_limit=args.per_engine_limit,
+        log_dir=args.log_dir,
+    ).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,30 @@ from pydantic import BaseModel
 
 from promptly.adapters.engine import TrinoCluster
 from promptly.adapters.postgres import HealthCareDB
+from promptly.adapters.query_stats import (
+    JsonlStatsHook,
+    PrometheusStatsHook,
+    log_stats,
+)
+from promptly.adapters.result_cache import (
+    DEFAULT_RESULT_CACHE_MAX_BYTES,
+    ResultCache,
+)
 from promptly.adapters.s3 import MinioS3
+from promptly.state.manifest import ObjectManifest
+from promptly.state.watermarks import DEFAULT_STATE_DB_URL, WatermarkStore
 
 
 class Settings(BaseModel):
     health_care_db: HealthCareDB
     trino_cluster: TrinoCluster
     s3: MinioS3
+    watermarks: WatermarkStore
+    manifest: ObjectManifest
+    # Tenant whose data this process handles, and where its objects live
+    tenant: str = 'default'
+    bucket: str = 'healthcare'
+    bucket_prefix: str = ''
 
     class Config:
         arbitrary_types_allowed = True
@@ -22,6 +39,9 @@ def configure_settings():
         access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
         secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin'),
         secure=False,
+        part_size=int(os.getenv('MINIO_PART_SIZE', '0')),
+        parallel_parts=int(os.getenv('MINIO_PARALLEL_PARTS', '3')),
+        max_connections=int(os.getenv('MINIO_MAX_CONNECTIONS', '10')),
     )
 
     health_care_db = HealthCareDB(
@@ -30,18 +50,71 @@ def configure_settings():
         host=os.getenv('HEALTH_CARE_DB_POSTGRES_HOST', 'localhost'),
         port=os.getenv('HEALTH_CARE_DB_POSTGRES_PORT', '5434'),
         db_name=os.getenv('HEALTH_CARE_DB_POSTGRES_DB', 'test'),
+        pool_size=int(os.getenv('HEALTH_CARE_DB_POOL_SIZE', '5')),
+        max_overflow=int(os.getenv('HEALTH_CARE_DB_POOL_MAX_OVERFLOW', '10')),
+        pool_timeout=float(os.getenv('HEALTH_CARE_DB_POOL_TIMEOUT', '30')),
+        pool_recycle=int(os.getenv('HEALTH_CARE_DB_POOL_RECYCLE', '1800')),
+        pool_pre_ping=(
+            os.getenv('HEALTH_CARE_DB_POOL_PRE_PING', 'true').lower() == 'true'
+        ),
+        statement_timeout_ms=int(
+            os.getenv('HEALTH_CARE_DB_STATEMENT_TIMEOUT_MS', '0')
+        ),
     )
 
+    trino_stats_hooks = []
+    if os.getenv('TRINO_STATS_LOG', 'false').lower() == 'true':
+        trino_stats_hooks.append(log_stats)
+    if os.getenv('TRINO_STATS_JSONL_PATH'):
+        trino_stats_hooks.append(
+            JsonlStatsHook(os.environ['TRINO_STATS_JSONL_PATH'])
+        )
+    if os.getenv('TRINO_STATS_PROMETHEUS_PATH'):
+        trino_stats_hooks.append(
+            PrometheusStatsHook(os.environ['TRINO_STATS_PROMETHEUS_PATH'])
+        )
+    explain_analyze_after = os.getenv('TRINO_EXPLAIN_ANALYZE_AFTER_SECONDS')
+    result_cache = None
+    if os.getenv('TRINO_RESULT_CACHE_DIR'):
+        result_cache = ResultCache(
+            directory=os.environ['TRINO_RESULT_CACHE_DIR'],
+            max_bytes=int(
+                os.getenv(
+                    'TRINO_RESULT_CACHE_MAX_BYTES',
+                    str(DEFAULT_RESULT_CACHE_MAX_BYTES),
+                )
+            ),
+        )
+
     trino_cluster = TrinoCluster(
         host=os.getenv('TRINO_HOST', 'localhost'),
         port=os.getenv('TRINO_PORT', '8080'),
         user=os.getenv('TRINO_USER', 'test'),
+        max_connections=int(os.getenv('TRINO_MAX_CONNECTIONS', '8')),
+        checkout_timeout=float(os.getenv('TRINO_POOL_TIMEOUT', '30')),
+        stats_hooks=trino_stats_hooks,
+        explain_analyze_after_seconds=(
+            float(explain_analyze_after) if explain_analyze_after else None
+        ),
+        metadata_ttl_seconds=float(
+            os.getenv('TRINO_METADATA_TTL_SECONDS', '300')
+        ),
+        result_cache=result_cache,
     )
 
+    state_db_url = os.getenv('PROMPTLY_STATE_DB_URL', DEFAULT_STATE_DB_URL)
+    watermarks = WatermarkStore(url=state_db_url)
+    manifest = ObjectManifest(url=state_db_url)
+
     settings = Settings(
         health_care_db=health_care_db,
         s3=minio,
         trino_cluster=trino_cluster,
+        watermarks=watermarks,
+        manifest=manifest,
+        tenant=os.getenv('PROMPTLY_TENANT', 'default'),
+        bucket=os.getenv('PROMPTLY_BUCKET', 'healthcare'),
+        bucket_prefix=os.getenv('PROMPTLY_BUCKET_PREFIX', ''),
     )
 
     return settings
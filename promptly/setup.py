@@ -7,6 +7,7 @@ import requests
 from sqlalchemy import text
 
 from promptly.adapters.data.postgres.datagen import ingest_fake_data
+from promptly.extractors.landing import convert_pending_drops
 from promptly.settings import Settings, configure_settings
 
 logger = loguru.logger
@@ -14,7 +15,11 @@ logger = loguru.logger
 
 def populate_postgres_with_medical_data_sample(settings: Settings):
     MAX_ROWS = 2_000_000
-    ingest_fake_data(MAX_NUM_ROWS=MAX_ROWS, db=settings.health_care_db)
+    ingest_fake_data(
+        MAX_NUM_ROWS=MAX_ROWS,
+        db=settings.health_care_db,
+        stream=True,
+    )
 
     with settings.health_care_db.engine.connect() as connection:
         result = connection.execute(text('SELECT COUNT(*) FROM provider;'))
@@ -40,12 +45,17 @@ def upload_sample_csv_to_minio(settings: Settings):
     logger.info('Sample CSV uploaded to MinIO successfully.')
 
 
+def convert_landing_csv_to_parquet(settings: Settings):
+    convert_pending_drops(settings)
+
+
 def main():
     settings = configure_settings()
     logger.info('Settings configured successfully.')
 
     # Upload data to Minio
     upload_sample_csv_to_minio(settings)
+    convert_landing_csv_to_parquet(settings)
 
     # Setup iceberg bucket
     settings.s3.create_bucket_if_not_exists('iceberg')
@@ -99,14 +109,9 @@ def main():
         raise
 
     # Create external csv tables in MiniO
-    define_default_external_catalog = """
-    CREATE SCHEMA s3.default
-        WITH (
-            location = 's3://healthcare/raw/'
-        )
-    """
-
-    settings.trino_cluster.execute_query(define_default_external_catalog)
+    settings.trino_cluster.ensure_schema(
+        's3', 'default', {'location': 's3://healthcare/raw/'}
+    )
 
     create_providers_table = """
     CREATE TABLE s3.default.providers (
@@ -127,7 +132,34 @@ def main():
     )
     """
 
-    settings.trino_cluster.execute_query(create_providers_table)
+    # Typed, sorted Parquet copy of the same drops
+    create_providers_parquet_table = """
+    CREATE TABLE s3.default.providers_parquet (
+        provider_name VARCHAR,
+        provider_id VARCHAR,
+        npi VARCHAR,
+        specialty VARCHAR,
+        site_name VARCHAR,
+        source_id VARCHAR,
+        spec_source VARCHAR,
+        id_source VARCHAR
+    )
+    WITH (
+        format = 'PARQUET',
+        external_location = 's3://healthcare/parquet/providers/'
+    )
+    """
+
+    external_tables = {
+        'providers': create_providers_table,
+        'providers_parquet': create_providers_parquet_table,
+    }
+    existing_tables = settings.trino_cluster.list_tables('s3', 'default')
+    settings.trino_cluster.run_many([
+        creation_sql
+        for table, creation_sql in external_tables.items()
+        if table not in existing_tables
+    ])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+from typing import Iterable
+
+import loguru
+from sqlalchemy import text
+
+from promptly.adapters.s3 import MinioS3, ObjectInfo
+from promptly.state.watermarks import DEFAULT_STATE_DB_URL, create_state_engine
+
+logger = loguru.logger
+
+
+class ObjectManifest:
+    """
+    Tracks which objects of a bucket have already been processed.
+
+    Each processed object is recorded with its etag and size, so a later
+    run only picks up keys that are new or were overwritten since. Lives
+    in the same state database as the extraction watermarks.
+    """
+
+    def __init__(self, url: str = DEFAULT_STATE_DB_URL):
+        self.engine = create_state_engine(url)
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                CREATE TABLE IF NOT EXISTS processed_objects (
+                    bucket VARCHAR(255) NOT NULL,
+                    object_name VARCHAR(1024) NOT NULL,
+                    etag VARCHAR(255),
+                    size BIGINT,
+                    processed_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (bucket, object_name)
+                )
+            """)
+            )
+
+    def pending(
+        self,
+        s3: MinioS3,
+        bucket: str,
+        prefix: str = '',
+    ) -> list[ObjectInfo]:
+        """Lists `prefix` and keeps only new or changed objects."""
+        return self.changed(
+            bucket, s3.list_objects(bucket, prefix, recursive=True), prefix
+        )
+
+    def changed(
+        self,
+        bucket: str,
+        objects: Iterable[ObjectInfo],
+        prefix: str = '',
+    ) -> list[ObjectInfo]:
+        """
+        Filters `objects` down to the ones whose etag or size differs from
+        what was recorded. `prefix` narrows the recorded entries loaded.
+        """
+        with self.engine.connect() as connection:
+            processed = {
+                object_name: (etag, size)
+                for object_name, etag, size in connection.execute(
+                    text("""
+                    SELECT object_name, etag, size
+                    FROM processed_objects
+                    WHERE bucket = :bucket
+                        AND object_name LIKE :pattern ESCAPE '\\'
+                """),
+                    {'bucket': bucket, 'pattern': _like_prefix(prefix)},
+                )
+            }
+
+        changed = [
+            obj
+            for obj in objects
+            if not obj.is_dir
+            and processed.get(obj.name) != (obj.etag, obj.size)
+        ]
+        logger.info(
+            f'{len(changed)} new or changed objects under '
+            + f'{bucket}/{prefix}.'
+        )
+        return changed
+
+    def mark_processed(self, bucket: str, objects: Iterable[ObjectInfo]):
+        rows = [
+            {
+                'bucket': bucket,
+                'object_name': obj.name,
+                'etag': obj.etag,
+                'size': obj.size,
+                'processed_at': datetime.now(timezone.utc),
+            }
+            for obj in objects
+        ]
+        if not rows:
+            return
+
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                INSERT INTO processed_objects (
+                    bucket, object_name, etag, size, processed_at
+                )
+                VALUES (
+                    :bucket, :object_name, :etag, :size, :processed_at
+                )
+                ON CONFLICT (bucket, object_name) DO UPDATE SET
+                    etag = excluded.etag,
+                    size = excluded.size,
+                    processed_at = excluded.processed_at
+            """),
+                rows,
+            )
+
+    def forget(self, bucket: str, prefix: str = ''):
+        """Drops recorded entries so their objects get processed again."""
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                DELETE FROM processed_objects
+                WHERE bucket = :bucket
+                    AND object_name LIKE :pattern ESCAPE '\\'
+            """),
+                {'bucket': bucket, 'pattern': _like_prefix(prefix)},
+            )
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = (
+        prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    return f'{escaped}%'
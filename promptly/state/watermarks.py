@@ -0,0 +1,109 @@
+import os
+from datetime import datetime, timezone
+
+import loguru
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+logger = loguru.logger
+
+DEFAULT_STATE_DB_URL = 'sqlite:///.promptly/state.db'
+
+
+def create_state_engine(url: str = DEFAULT_STATE_DB_URL):
+    """Engine for the state database, creating a local SQLite dir if needed."""
+    database = make_url(url).database
+    if url.startswith('sqlite') and database and database != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    return create_engine(url)
+
+
+class WatermarkStore:
+    """
+    Persists the high-water mark reached per source, table and tenant.
+
+    Backed by any SQLAlchemy database: a local SQLite file by default, or
+    a Postgres table when several workers share the state. Marks are
+    stored as text and compared by the source database, so they can be
+    ids, timestamps or LSNs.
+    """
+
+    def __init__(self, url: str = DEFAULT_STATE_DB_URL):
+        self.engine = create_state_engine(url)
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                CREATE TABLE IF NOT EXISTS extraction_watermarks (
+                    source VARCHAR(255) NOT NULL,
+                    table_name VARCHAR(255) NOT NULL,
+                    tenant VARCHAR(255) NOT NULL,
+                    high_water_mark VARCHAR(255) NOT NULL,
+                    updated_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (source, table_name, tenant)
+                )
+            """)
+            )
+
+    def get(
+        self,
+        source: str,
+        table: str,
+        tenant: str = 'default',
+    ) -> str | None:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                text("""
+                SELECT high_water_mark
+                FROM extraction_watermarks
+                WHERE source = :source
+                    AND table_name = :table_name
+                    AND tenant = :tenant
+            """),
+                {'source': source, 'table_name': table, 'tenant': tenant},
+            ).scalar()
+
+    def set(
+        self,
+        source: str,
+        table: str,
+        high_water_mark,
+        tenant: str = 'default',
+    ):
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                INSERT INTO extraction_watermarks (
+                    source, table_name, tenant, high_water_mark, updated_at
+                )
+                VALUES (
+                    :source, :table_name, :tenant, :high_water_mark,
+                    :updated_at
+                )
+                ON CONFLICT (source, table_name, tenant) DO UPDATE SET
+                    high_water_mark = excluded.high_water_mark,
+                    updated_at = excluded.updated_at
+            """),
+                {
+                    'source': source,
+                    'table_name': table,
+                    'tenant': tenant,
+                    'high_water_mark': str(high_water_mark),
+                    'updated_at': datetime.now(timezone.utc),
+                },
+            )
+        logger.info(
+            f'Watermark for {source}.{table} ({tenant}) set to '
+            + f'{high_water_mark}.'
+        )
+
+    def reset(self, source: str, table: str, tenant: str = 'default'):
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("""
+                DELETE FROM extraction_watermarks
+                WHERE source = :source
+                    AND table_name = :table_name
+                    AND tenant = :tenant
+            """),
+                {'source': source, 'table_name': table, 'tenant': tenant},
+            )
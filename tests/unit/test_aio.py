@@ -0,0 +1,66 @@
+import asyncio
+
+from promptly.adapters import engine
+from promptly.adapters.aio import AsyncTrinoCluster
+from promptly.adapters.engine import TrinoCluster
+
+MAX_CONNECTIONS = 2
+CONSUMERS = 6
+ROWS = 3
+
+
+class FakeCursor:
+    description = [('n', 'integer')]
+
+    def __init__(self):
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query):
+        self.rows = [(n,) for n in range(ROWS)]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class FakeConnection:
+    @staticmethod
+    def cursor():
+        return FakeCursor()
+
+
+def test_more_iterators_than_connections_do_not_deadlock(monkeypatch):
+    """
+    Given more concurrent query iterators than pooled Trino connections
+    When they are all consumed one row per hop
+    Then every consumer finishes instead of waiting on the pool forever
+    """
+    monkeypatch.setattr(engine, 'connect', lambda **_: FakeConnection())
+    trino = TrinoCluster(
+        'localhost', 8080, 'test', max_connections=MAX_CONNECTIONS
+    )
+
+    async def consume(aio: AsyncTrinoCluster) -> int:
+        rows = 0
+        async for batch in aio.iterate('iter_query', 'SELECT', batch_size=1):
+            rows += len(batch)
+            await asyncio.sleep(0)
+        return rows
+
+    async def main() -> list[int]:
+        aio = AsyncTrinoCluster(trino, max_concurrency=MAX_CONNECTIONS)
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(consume(aio) for _ in range(CONSUMERS))),
+                timeout=10,
+            )
+        finally:
+            aio._executor.shutdown(wait=False, cancel_futures=True)
+
+    assert asyncio.run(main()) == [ROWS] * CONSUMERS
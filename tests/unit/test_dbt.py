@@ -0,0 +1,143 @@
+import pytest
+from dbt.cli.main import dbtRunnerResult
+
+from promptly.adapters import dbt
+from promptly.adapters.dbt import DbtProject
+
+MANIFEST = object()
+
+
+class FakeRunner:
+    calls = []
+    failing = set()
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+
+    def invoke(self, args):
+        FakeRunner.calls.append((args[0], self.manifest))
+        if args[0] in FakeRunner.failing:
+            return dbtRunnerResult(False, exception=ValueError(args[0]))
+        return dbtRunnerResult(
+            True, result=MANIFEST if args[0] == 'parse' else None
+        )
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    FakeRunner.calls = []
+    FakeRunner.failing = set()
+    monkeypatch.setattr(dbt, 'dbtRunner', FakeRunner)
+    return FakeRunner
+
+
+def test_manifest_is_parsed_once_and_reused(runner):
+    """
+    Given a dbt project that was not parsed yet
+    When several commands run, with deps in between
+    Then the project is parsed once per deps and the manifest is reused
+    """
+    project = DbtProject()
+
+    project.run()
+    project.test()
+    project.deps()
+    project.run()
+
+    assert runner.calls == [
+        ('parse', None),
+        ('run', MANIFEST),
+        ('test', MANIFEST),
+        ('deps', MANIFEST),
+        ('parse', None),
+        ('run', MANIFEST),
+    ]
+
+
+def test_failed_invocation_raises_and_is_timed(runner):
+    """
+    Given a dbt command that fails
+    When it is invoked
+    Then it raises with the cause chained and its timing is recorded
+    """
+    runner.failing = {'run'}
+    project = DbtProject()
+
+    with pytest.raises(RuntimeError, match='DBT Run failed') as error:
+        project.run()
+
+    assert isinstance(error.value.__cause__, ValueError)
+    assert [(t.description, t.success) for t in project.timings] == [
+        ('DBT Parse', True),
+        ('DBT Run', False),
+    ]
+
+
+def test_state_selection_without_state(tmp_path):
+    """
+    Given no saved state
+    When the state selection is built
+    Then it is empty, so everything runs
+    """
+    assert not DbtProject(state_dir=str(tmp_path / 'state')).state_selection()
+    assert not DbtProject().state_selection()
+
+
+def test_state_selection_with_state(tmp_path, monkeypatch):
+    """
+    Given saved state with and without source freshness results
+    When the state selection is built
+    Then source_status:fresher+ is only added when both runs have them
+    """
+    state_dir = tmp_path / 'state'
+    target_dir = tmp_path / 'project' / 'target'
+    state_dir.mkdir()
+    target_dir.mkdir(parents=True)
+    (state_dir / 'manifest.json').write_text('{}')
+    monkeypatch.delenv('DBT_TARGET_PATH', raising=False)
+    project = DbtProject(
+        project_dir=str(tmp_path / 'project'), state_dir=str(state_dir)
+    )
+
+    assert project.state_selection() == [
+        '--select',
+        'state:modified+',
+        '--state',
+        str(state_dir),
+    ]
+
+    (state_dir / 'sources.json').write_text('{}')
+    (target_dir / 'sources.json').write_text('{}')
+
+    assert 'source_status:fresher+' in project.state_selection()
+
+
+def test_source_freshness_drops_last_runs_results(
+    runner, tmp_path, monkeypatch
+):
+    """
+    Given sources.json left in the target dir by the previous run
+    When this run's freshness check can't run at all
+    Then it raises and fresher sources are no longer selected
+    """
+    target_dir = tmp_path / 'project' / 'target'
+    state_dir = tmp_path / 'state'
+    target_dir.mkdir(parents=True)
+    state_dir.mkdir()
+    for path in [
+        target_dir / 'sources.json',
+        state_dir / 'sources.json',
+        state_dir / 'manifest.json',
+    ]:
+        path.write_text('{}')
+    runner.failing = {'source'}
+    monkeypatch.delenv('DBT_TARGET_PATH', raising=False)
+    project = DbtProject(
+        project_dir=str(tmp_path / 'project'), state_dir=str(state_dir)
+    )
+
+    with pytest.raises(RuntimeError, match='Source Freshness failed'):
+        project.source_freshness()
+
+    assert not (target_dir / 'sources.json').exists()
+    assert 'source_status:fresher+' not in project.state_selection()
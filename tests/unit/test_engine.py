@@ -0,0 +1,20 @@
+import pytest
+
+from promptly.adapters import engine
+from promptly.adapters.engine import TrinoCluster
+
+
+def test_checkout_times_out_when_pool_is_exhausted(monkeypatch):
+    """
+    Given a single pooled Trino connection that is checked out
+    When the same thread asks for another one
+    Then it gets a timeout error instead of waiting forever
+    """
+    monkeypatch.setattr(engine, 'connect', lambda **_: object())
+    trino = TrinoCluster(
+        'localhost', 8080, 'test', max_connections=1, checkout_timeout=0.01
+    )
+
+    with trino.connection():
+        with pytest.raises(TimeoutError, match='all 1 are checked out'):
+            trino.execute_query('SELECT 1')
@@ -0,0 +1,51 @@
+import pyarrow.parquet as pq
+
+from promptly.adapters.s3 import ObjectInfo
+from promptly.extractors.landing import LandingCsvConverter
+
+ROW_GROUP_SIZE = 2
+HEADER = 'ProviderName,ProviderID,NPI,Specialty,SiteName,SourceID,'
+HEADER += 'SpecSource,IDSource\n'
+
+
+class FakeS3:
+    def __init__(self, csv: str):
+        self.csv = csv.encode('utf-8')
+        self.uploads = {}
+
+    def open_stream(self, bucket_name, object_name):
+        yield self.csv
+
+    def upload_file(self, bucket_name, object_name, file_path):
+        self.uploads[object_name] = pq.read_table(file_path)
+        return object_name
+
+
+def test_convert_sorts_each_row_group(tmp_path):
+    """
+    Given a CSV drop larger than one row group, with NULL literals
+    When it is converted to Parquet
+    Then every row group is sorted and NULL literals become nulls
+    """
+    rows = [
+        'D,004,40,s,site,1,x,y',
+        'C,003,30,s,site,1,x,y',
+        'B,002,NULL,s,site,1,x,y',
+        'A,001,10,s,site,1,x,y',
+        'E,005,50,s,site,1,x,y',
+    ]
+    s3 = FakeS3(HEADER + '\n'.join(rows) + '\n')
+    converter = LandingCsvConverter(
+        s3=s3,
+        manifest=None,
+        landing_prefix='raw/',
+        row_group_size=ROW_GROUP_SIZE,
+    )
+
+    object_name = converter.convert(ObjectInfo('raw/a/drop.csv', 1, '', None))
+
+    table = s3.uploads[object_name]
+    assert object_name == 'parquet/providers/a__drop.parquet'
+    assert table.schema == converter.schema
+    assert table.column('npi').to_pylist() == ['30', '40', '10', None, '50']
+    assert table.column('provider_id').to_pylist()[0] == '003'
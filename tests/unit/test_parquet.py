@@ -0,0 +1,74 @@
+import pyarrow as pa
+import pytest
+
+from promptly.extractors.parquet import (
+    PostgresParquetExtractor,
+    regroup_batches,
+)
+from promptly.state.watermarks import WatermarkStore
+
+SCHEMA = pa.schema([('id', pa.int64())])
+
+
+def batch(start: int, stop: int) -> pa.RecordBatch:
+    return pa.record_batch([pa.array(range(start, stop))], schema=SCHEMA)
+
+
+class FakeDB:
+    @staticmethod
+    def arrow_schema(table):
+        return SCHEMA
+
+    @staticmethod
+    def execute_query(query):
+        return [(10,)]
+
+    @staticmethod
+    def iter_copy_batches(query, schema, snapshot=None):
+        yield batch(0, 10)
+
+
+class FailingS3:
+    @staticmethod
+    def upload_file(bucket_name, object_name, file_path):
+        return None
+
+
+def test_regroup_batches_slices_into_fixed_size_tables():
+    """
+    Given batches of uneven sizes
+    When they are regrouped into tables of 4 rows
+    Then every table but the last has 4 rows and row order is kept
+    """
+    batches = [batch(0, 3), batch(3, 4), batch(4, 13)]
+
+    tables = list(regroup_batches(batches, SCHEMA, 4))
+
+    assert [table.num_rows for table in tables] == [4, 4, 4, 1]
+    assert pa.concat_tables(tables).column('id').to_pylist() == list(range(13))
+
+
+def test_regroup_batches_empty_input():
+    """
+    Given no batches, or only empty ones
+    When they are regrouped
+    Then nothing is yielded
+    """
+    assert not list(regroup_batches([], SCHEMA, 4))
+    assert not list(regroup_batches([batch(0, 0)], SCHEMA, 4))
+
+
+def test_failed_upload_keeps_watermark(tmp_path):
+    """
+    Given an object store whose uploads fail
+    When an incremental extraction runs
+    Then it raises and the watermark is not advanced
+    """
+    watermarks = WatermarkStore(f'sqlite:///{tmp_path / "state.db"}')
+    watermarks.set('postgres', 'provider', 5)
+    extractor = PostgresParquetExtractor(db=FakeDB(), s3=FailingS3())
+
+    with pytest.raises(RuntimeError, match='Failed to upload'):
+        extractor.extract_incremental('provider', 'id', watermarks)
+
+    assert watermarks.get('postgres', 'provider') == '5'
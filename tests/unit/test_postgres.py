@@ -0,0 +1,178 @@
+import struct
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from promptly.adapters.postgres import (
+    PGCOPY_HEADER,
+    PGCOPY_TRAILER,
+    _WorkerTransactions,  # noqa: PLC2701
+    encode_binary_copy,
+    iter_binary_copy,
+)
+
+
+def field(value: bytes) -> bytes:
+    return struct.pack('>i', len(value)) + value
+
+
+NULL = struct.pack('>i', -1)
+
+
+def test_encode_binary_copy_fixed_and_variable_width():
+    """
+    Given a batch with integer, text and NULL values
+    When it is encoded for binary COPY
+    Then every tuple has the field count, lengths and big-endian payloads
+    """
+    batch = pa.record_batch({
+        'id': pa.array([1, None, -2], type=pa.int32()),
+        'name': pa.array(['ab', None, ''], type=pa.string()),
+    })
+
+    encoded = encode_binary_copy(batch)
+
+    assert encoded == (
+        struct.pack('>h', 2)
+        + field(struct.pack('>i', 1))
+        + field(b'ab')
+        + struct.pack('>h', 2)
+        + NULL
+        + NULL
+        + struct.pack('>h', 2)
+        + field(struct.pack('>i', -2))
+        + field(b'')
+    )
+
+
+def test_encode_binary_copy_dates_from_postgres_epoch():
+    """
+    Given date, timestamp, boolean and float columns
+    When they are encoded for binary COPY
+    Then dates and timestamps count from 2000-01-01
+    """
+    batch = pa.record_batch({
+        'day': pa.array([date(2000, 1, 2)], type=pa.date32()),
+        'at': pa.array(
+            [datetime(2000, 1, 1, 0, 0, 1)], type=pa.timestamp('us')
+        ),
+        'flag': pa.array([True]),
+        'score': pa.array([1.5], type=pa.float64()),
+    })
+
+    encoded = encode_binary_copy(batch)
+
+    assert encoded == (
+        struct.pack('>h', 4)
+        + field(struct.pack('>i', 1))
+        + field(struct.pack('>q', 1_000_000))
+        + field(b'\x01')
+        + field(struct.pack('>d', 1.5))
+    )
+
+
+def test_iter_binary_copy_casts_frames_to_schema():
+    """
+    Given a DataFrame with extra columns and a narrower target schema
+    When a binary COPY stream is built from it
+    Then only the schema columns are sent, cast to the schema types
+    """
+    schema = pa.schema([('id', pa.int16()), ('name', pa.string())])
+    df = pd.DataFrame({'name': ['x'], 'id': [7], 'ignored': [0.1]})
+
+    stream = b''.join(iter_binary_copy([df], schema))
+
+    assert stream == (
+        PGCOPY_HEADER
+        + struct.pack('>h', 2)
+        + field(struct.pack('>h', 7))
+        + field(b'x')
+        + PGCOPY_TRAILER
+    )
+
+
+class FakeConnection:
+    def __init__(self, log: list, name: str, fail_on: str | None = None):
+        self.log = log
+        self.name = name
+        self.fail_on = fail_on
+
+    def __getattr__(self, method: str):
+        def call(*args):
+            if method == self.fail_on:
+                raise RuntimeError(f'{method} failed')
+            self.log.append((self.name, method, *args))
+
+        return call
+
+
+def test_two_phase_commit_prepares_every_worker_first():
+    """
+    Given worker transactions with two-phase commit
+    When they are committed
+    Then all of them are prepared before the first one commits
+    """
+    log = []
+    transactions = _WorkerTransactions(
+        [FakeConnection(log, 'a'), FakeConnection(log, 'b')], two_phase=True
+    )
+
+    transactions.commit()
+
+    assert [entry[:2] for entry in log] == [
+        ('a', 'tpc_begin'),
+        ('b', 'tpc_begin'),
+        ('a', 'tpc_prepare'),
+        ('b', 'tpc_prepare'),
+        ('a', 'tpc_commit'),
+        ('b', 'tpc_commit'),
+    ]
+
+
+def test_failed_prepare_rolls_back_every_worker():
+    """
+    Given worker transactions where the second prepare fails
+    When the commit fails and they are rolled back
+    Then every worker, prepared or not, is rolled back
+    """
+    log = []
+    transactions = _WorkerTransactions(
+        [
+            FakeConnection(log, 'a'),
+            FakeConnection(log, 'b', fail_on='tpc_prepare'),
+        ],
+        two_phase=True,
+    )
+
+    with pytest.raises(RuntimeError):
+        transactions.commit()
+    outcome = transactions.rollback()
+
+    assert ('a', 'tpc_rollback') in log
+    assert ('b', 'tpc_rollback') in log
+    assert outcome == 'rolled back 2 of 2 worker transactions'
+
+
+def test_failed_commit_without_two_phase_keeps_earlier_commits():
+    """
+    Given worker transactions without two-phase commit
+    When the second commit fails and they are rolled back
+    Then only the uncommitted worker is rolled back
+    """
+    log = []
+    transactions = _WorkerTransactions(
+        [
+            FakeConnection(log, 'a'),
+            FakeConnection(log, 'b', fail_on='commit'),
+        ],
+        two_phase=False,
+    )
+
+    with pytest.raises(RuntimeError):
+        transactions.commit()
+    outcome = transactions.rollback()
+
+    assert log == [('a', 'commit'), ('b', 'rollback')]
+    assert outcome == 'rolled back 1 of 2 worker transactions'
@@ -0,0 +1,59 @@
+import pytest
+
+from promptly.adapters.result_cache import referenced_tables
+
+
+@pytest.mark.parametrize(
+    ('query', 'expected'),
+    [
+        ('SELECT * FROM iceberg.a.b', ['iceberg.a.b']),
+        (
+            'SELECT * FROM iceberg.a.b x JOIN iceberg.c.d y ON x.id = y.id',
+            ['iceberg.a.b', 'iceberg.c.d'],
+        ),
+        ('SELECT * FROM "iceberg"."a"."b"', ['iceberg.a.b']),
+        (
+            'WITH t AS (SELECT id FROM iceberg.a.b) SELECT * FROM t',
+            ['iceberg.a.b'],
+        ),
+        (
+            'SELECT * FROM (SELECT * FROM iceberg.a.b) x '
+            + 'LEFT JOIN iceberg.c.d y ON x.id = y.id',
+            ['iceberg.a.b', 'iceberg.c.d'],
+        ),
+        (
+            'SELECT a, b FROM iceberg.a.b WHERE c IN (1, 2) ORDER BY a, b',
+            ['iceberg.a.b'],
+        ),
+        ("SELECT * FROM iceberg.a.b WHERE s = 'from x, y'", ['iceberg.a.b']),
+    ],
+)
+def test_referenced_tables(query, expected):
+    """
+    Given a read-only query over fully qualified tables
+    When its tables are extracted
+    Then every table it reads is returned
+    """
+    assert referenced_tables(query) == expected
+
+
+@pytest.mark.parametrize(
+    'query',
+    [
+        'SELECT count(*) FROM iceberg.a.b, iceberg.c.d',
+        'SELECT * FROM (SELECT 1) x, iceberg.a.b',
+        'SELECT * FROM iceberg.a.b x JOIN iceberg.c.d y ON x.i = y.i, e.f.g',
+        'SELECT * FROM TABLE(system.query(query => 1))',
+        'SELECT * FROM iceberg.a.b CROSS JOIN UNNEST(b.items)',
+        'SELECT * FROM (iceberg.a.b JOIN iceberg.c.d USING (id))',
+        'SELECT * FROM b',
+        'SELECT extract(year FROM ts) FROM iceberg.a.b',
+    ],
+)
+def test_referenced_tables_uncertain(query):
+    """
+    Given a query whose relations the scan can't all pin down
+    When its tables are extracted
+    Then None is returned so the result isn't cached
+    """
+    assert referenced_tables(query) is None
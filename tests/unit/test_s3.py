@@ -0,0 +1,74 @@
+import pytest
+from minio.error import S3Error
+
+from promptly.adapters.s3 import MinioS3, ObjectInfo
+
+PAGE_SIZE = 3
+
+
+def make_s3(monkeypatch, listings: dict, listed: list) -> MinioS3:
+    s3 = MinioS3('localhost:9000', 'key', 'secret', secure=False)
+
+    def list_objects(bucket_name, prefix, recursive=False):
+        for name in listings[prefix]:
+            if isinstance(name, Exception):
+                raise name
+            listed.append(name)
+            yield ObjectInfo(name, 1, None, None)
+
+    monkeypatch.setattr(s3, 'list_objects', list_objects)
+    return s3
+
+
+def test_list_objects_many_keeps_prefix_order(monkeypatch):
+    """
+    Given several prefixes listed concurrently
+    When their objects are consumed
+    Then they come prefix by prefix, in the order given
+    """
+    listings = {
+        prefix: [f'{prefix}{index}' for index in range(PAGE_SIZE)]
+        for prefix in ['a/', 'b/', 'c/']
+    }
+    s3 = make_s3(monkeypatch, listings, [])
+
+    names = [
+        info.name
+        for info in s3.list_objects_many(
+            'bucket', ['c/', 'a/', 'b/'], max_workers=2, buffer_size=1
+        )
+    ]
+
+    assert names == listings['c/'] + listings['a/'] + listings['b/']
+
+
+def test_list_objects_many_raises_listing_errors(monkeypatch):
+    """
+    Given a listing that fails part way through
+    When the objects are consumed
+    Then the error is raised instead of a truncated listing
+    """
+    error = S3Error('InternalError', 'boom', '', '', '', None)
+    s3 = make_s3(monkeypatch, {'a/': ['a/0', error]}, [])
+
+    with pytest.raises(S3Error):
+        list(s3.list_objects_many('bucket', ['a/']))
+
+
+def test_list_objects_many_stays_lazy(monkeypatch):
+    """
+    Given a long listing and a small buffer
+    When the consumer stops after the first object
+    Then the listing only ran a bounded distance ahead
+    """
+    listed = []
+    s3 = make_s3(
+        monkeypatch, {'a/': [f'a/{index}' for index in range(1000)]}, listed
+    )
+
+    objects = s3.list_objects_many('bucket', ['a/'], buffer_size=PAGE_SIZE)
+    first = next(objects)
+    objects.close()
+
+    assert first.name == 'a/0'
+    assert len(listed) <= 2 * PAGE_SIZE
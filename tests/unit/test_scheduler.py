@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from promptly.orchestration.scheduler import Step, StepScheduler
+
+RETRIES = 2
+
+
+def test_steps_run_after_their_dependencies():
+    """
+    Given steps that depend on each other
+    When the scheduler runs them
+    Then every step starts only after its dependencies finished
+    """
+    order = []
+    steps = [
+        Step('c', lambda: order.append('c'), depends_on=['a', 'b']),
+        Step('b', lambda: order.append('b'), depends_on=['a']),
+        Step('a', lambda: order.append('a')),
+    ]
+
+    outcomes = StepScheduler(steps).run()
+
+    assert order == ['a', 'b', 'c']
+    assert {o.status for o in outcomes.values()} == {'done'}
+
+
+def test_resources_serialize_steps():
+    """
+    Given independent steps that all hold the single 'dbt' unit
+    When the scheduler runs them on several workers
+    Then no two of them run at the same time
+    """
+    lock = threading.Lock()
+    overlaps = []
+
+    def hold():
+        if not lock.acquire(blocking=False):
+            overlaps.append(True)
+            return
+        time.sleep(0.02)
+        lock.release()
+
+    steps = [Step(f's{i}', hold, resources={'dbt': 1}) for i in range(4)]
+
+    StepScheduler(steps, max_workers=4, resource_limits={'dbt': 1}).run()
+
+    assert not overlaps
+
+
+def test_failed_step_is_retried_then_skips_dependents():
+    """
+    Given a step that always fails and a step depending on it
+    When the scheduler runs them
+    Then the step is retried, its dependent is skipped, others still run
+    """
+    calls = []
+
+    def fail():
+        calls.append('fail')
+        raise ValueError('boom')
+
+    ran = []
+    steps = [
+        Step('fail', fail, retries=RETRIES, backoff_seconds=0),
+        Step('child', lambda: ran.append('child'), depends_on=['fail']),
+        Step('grandchild', lambda: None, depends_on=['child']),
+        Step('other', lambda: ran.append('other')),
+    ]
+    scheduler = StepScheduler(steps)
+
+    with pytest.raises(RuntimeError, match='Steps failed: fail'):
+        scheduler.run()
+
+    assert len(calls) == RETRIES + 1
+    assert ran == ['other']
+
+
+def test_retry_recovers_from_a_transient_failure():
+    """
+    Given a step that fails once and then succeeds
+    When the scheduler runs it with retries
+    Then it ends up done without using every attempt
+    """
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError('transient')
+
+    outcomes = StepScheduler([
+        Step('flaky', flaky, retries=RETRIES, backoff_seconds=0)
+    ]).run()
+
+    assert outcomes['flaky'].status == 'done'
+    assert outcomes['flaky'].attempts == len(attempts) < RETRIES + 1
+
+
+@pytest.mark.parametrize(
+    ('steps', 'message'),
+    [
+        ([Step('a', lambda: None, depends_on=['x'])], 'unknown x'),
+        (
+            [
+                Step('a', lambda: None, depends_on=['b']),
+                Step('b', lambda: None, depends_on=['a']),
+            ],
+            'cycle',
+        ),
+        ([Step('a', lambda: None, resources={'dbt': 2})], 'limit of 1'),
+    ],
+)
+def test_invalid_graphs_are_rejected(steps, message):
+    """
+    Given an unknown dependency, a cycle or an oversized resource claim
+    When the scheduler is built
+    Then it raises before running anything
+    """
+    with pytest.raises(ValueError, match=message):
+        StepScheduler(steps, resource_limits={'dbt': 1})
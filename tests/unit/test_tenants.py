@@ -0,0 +1,74 @@
+import pytest
+
+from promptly.orchestration.tenants import load_tenants
+
+
+def write_registry(tmp_path, content: str) -> str:
+    path = tmp_path / 'tenants.yaml'
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def test_load_tenants_merges_defaults(tmp_path):
+    """
+    Given a registry with defaults and per-tenant overrides
+    When it is loaded
+    Then each tenant combines both, overrides winning
+    """
+    path = write_registry(
+        tmp_path,
+        """
+defaults:
+  bucket: healthcare
+  env: {TRINO_HOST: shared}
+tenants:
+  - name: acme
+    trino_schema: acme
+    bucket_prefix: tenants/acme/
+    env: {DB_HOST: acme}
+""",
+    )
+
+    [tenant] = load_tenants(path)
+
+    assert tenant.bucket == 'healthcare'
+    assert tenant.environment()['PROMPTLY_BUCKET_PREFIX'] == 'tenants/acme/'
+    assert tenant.env == {'TRINO_HOST': 'shared', 'DB_HOST': 'acme'}
+
+
+def test_load_tenants_rejects_shared_bucket_prefix(tmp_path):
+    """
+    Given two tenants with the same bucket prefix
+    When the registry is loaded
+    Then it raises, since their Iceberg tables would share storage
+    """
+    path = write_registry(
+        tmp_path,
+        """
+tenants:
+  - {name: a, trino_schema: a, bucket_prefix: shared/}
+  - {name: b, trino_schema: b, bucket_prefix: shared/}
+""",
+    )
+
+    with pytest.raises(ValueError, match='share a bucket prefix'):
+        load_tenants(path)
+
+
+def test_load_tenants_rejects_shared_trino_schema(tmp_path):
+    """
+    Given two tenants with the same Trino schema but different prefixes
+    When the registry is loaded
+    Then it raises, since they would replace each other's tables
+    """
+    path = write_registry(
+        tmp_path,
+        """
+tenants:
+  - {name: a, trino_schema: shared, bucket_prefix: a/}
+  - {name: b, trino_schema: shared, bucket_prefix: b/}
+""",
+    )
+
+    with pytest.raises(ValueError, match='share a Trino schema'):
+        load_tenants(path)